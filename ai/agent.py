@@ -2,8 +2,12 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import random
+import threading
+import time
+import uuid
 import numpy as np
 from collections import deque
+from utils.profiler import profiler
 
 class DQN(nn.Module):
     def __init__(self, input_size, output_size, hidden_size):
@@ -24,10 +28,11 @@ class DQN(nn.Module):
         return x
 
 class Agent:
-    def __init__(self, settings):
+    def __init__(self, settings, learner=None):
         self.settings = settings
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         hidden_size = int(min(settings.width, settings.height) * 0.1)
+        self.hidden_size = hidden_size
         
         # Change the input size from 8 to 11
         self.input_size = 11
@@ -37,7 +42,9 @@ class Agent:
         self.target_net.eval()
 
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=0.001)
-        self.memory = PrioritizedReplayBuffer(capacity=100000000, alpha=0.6)
+        # In shared-replay self-play agent2 feeds the learner's buffer instead of allocating its own
+        self.learner = learner
+        self.memory = learner.memory if learner else PrioritizedReplayBuffer(capacity=100000000, alpha=0.6)
         self.batch_size = 64
         self.gamma = 0.99
         self.initial_epsilon = 1.0
@@ -52,10 +59,13 @@ class Agent:
         self.rebounds = 0
         self.max_rebounds = 100  # Maximum rebounds for 100% confidence
         self.beta = 0.4
+        self.reset_training_stats()
+        self.total_train_steps = 0
         self.beta_increment = 0.001
         self.last_reward = None
         self.n_step = 3  # Number of steps for multi-step learning
         self.n_step_buffer = deque(maxlen=self.n_step)
+        self.action_repeat = max(1, int(round(settings.action_repeat)))  # Ticks each chosen action is held
 
     def get_action(self, state):
         if random.random() < self.epsilon:
@@ -67,30 +77,50 @@ class Agent:
                 return q_values.max(1)[1].item()
 
     def update(self, state, action, reward, next_state):
-        # Calculate the TD error for prioritization
-        state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
-        next_state_tensor = torch.FloatTensor(next_state).unsqueeze(0).to(self.device)
-        
-        current_q = self.policy_net(state_tensor).gather(1, torch.tensor([[action]]).to(self.device)).item()
-        next_q = self.target_net(next_state_tensor).max(1)[0].item()
+        self.remember(state, action, reward, next_state)
+        if self.learn():
+            self.dynamic_epsilon_decay(reward)
+
+    def remember(self, state, action, reward, next_state):
+        start = time.perf_counter()
+        # Calculate the TD error for prioritization, with the networks that will learn from it
+        learner = self.learner or self
+        with torch.no_grad():
+            state_tensor = torch.FloatTensor(state).unsqueeze(0).to(learner.device)
+            next_state_tensor = torch.FloatTensor(next_state).unsqueeze(0).to(learner.device)
+
+            current_q = learner.policy_net(state_tensor).gather(1, torch.tensor([[action]]).to(learner.device)).item()
+            next_q = learner.target_net(next_state_tensor).max(1)[0].item()
         expected_q = reward + self.gamma * next_q
-        
+
         td_error = abs(current_q - expected_q)
-        
+
         self.last_reward = reward
         self.memory.add(td_error, (state, action, reward, next_state))
 
-        if len(self.memory) < self.batch_size:
-            return
+        self.n_step_buffer.append((state, action, reward))
+
+        if len(self.n_step_buffer) >= self.n_step:
+            n_step_return = self.calculate_n_step_return()
+            self.memory.add(td_error, (self.n_step_buffer[0][0], self.n_step_buffer[0][1], n_step_return, next_state))
+            self.n_step_buffer.popleft()
+        profiler.record('remember', start)
+
+    def learn(self):
+        if len(self.memory) < self.batch_size or not self.memory.is_warm():
+            return False
 
         # Sample a batch of experiences based on their priorities
+        start = time.perf_counter()
         batch, indices, weights = self.memory.sample(self.batch_size, self.beta)
+        profiler.record('replay_sample', start)
+        start = time.perf_counter()
         states, actions, rewards, next_states = zip(*batch)
 
-        states = torch.FloatTensor(states).to(self.device)
+        states = torch.FloatTensor(np.array(states)).to(self.device)
         actions = torch.LongTensor(actions).to(self.device)
         rewards = torch.FloatTensor(rewards).to(self.device)
-        next_states = torch.FloatTensor(next_states).to(self.device)
+        next_states = torch.FloatTensor(np.array(next_states)).to(self.device)
         weights = torch.FloatTensor(weights).to(self.device)
 
         # Calculate current Q values
@@ -112,18 +142,58 @@ class Agent:
         td_errors = abs(current_q_values - expected_q_values.unsqueeze(1)).detach().cpu().numpy()
         for i, td_error in zip(indices, td_errors):
             self.memory.update(i, td_error[0])
+        profiler.record('backprop', start)
 
-        self.dynamic_epsilon_decay(reward)
+        # Running sums for the metrics stream, read and reset by pop_training_stats
+        q_values = current_q_values.detach()
+        self.total_train_steps += 1
+        self.training_stats['train_steps'] += 1
+        self.training_stats['loss'] += loss.item()
+        self.training_stats['q_sum'] += q_values.mean().item()
+        self.training_stats['q_max'] = max(self.training_stats['q_max'], q_values.max().item())
+        self.training_stats['td_error'] += float(td_errors.mean())
 
         # Increase beta for importance sampling
         self.beta = min(1.0, self.beta + self.beta_increment)
+        return True
+
+    def pop_training_stats(self):
+        """Averages over the learning steps since the last call"""
+        stats = self.training_stats
+        steps = stats['train_steps']
+        self.reset_training_stats()
+        return {
+            'train_steps': steps,
+            'loss': stats['loss'] / steps if steps else None,
+            'q_mean': stats['q_sum'] / steps if steps else None,
+            'q_max': stats['q_max'] if steps else None,
+            'td_error': stats['td_error'] / steps if steps else None,
+        }
+
+    def reset_training_stats(self):
+        self.training_stats = {'train_steps': 0, 'loss': 0.0, 'q_sum': 0.0, 'q_max': float('-inf'), 'td_error': 0.0}
+
+    def pretrain(self, states, actions, epochs=10, batch_size=256):
+        # Behaviour cloning warm start: Q-values are treated as logits for the demonstrated action
+        states = torch.FloatTensor(states).to(self.device)
+        actions = torch.LongTensor(actions).to(self.device)
+        for _ in range(epochs):
+            permutation = torch.randperm(len(states), device=self.device)
+            for start in range(0, len(states), batch_size):
+                batch = permutation[start:start + batch_size]
+                loss = nn.functional.cross_entropy(self.policy_net(states[batch]), actions[batch])
+                self.optimizer.zero_grad()
+                loss.backward()
+                self.optimizer.step()
+        self.update_target_network()
 
-        self.n_step_buffer.append((state, action, reward))
-        
-        if len(self.n_step_buffer) >= self.n_step:
-            n_step_return = self.calculate_n_step_return()
-            self.memory.add(td_error, (self.n_step_buffer[0][0], self.n_step_buffer[0][1], n_step_return, next_state))
-            self.n_step_buffer.popleft()
+        with torch.no_grad():
+            return (self.policy_net(states).max(1)[1] == actions).float().mean().item()
+
+    def share_memory(self, other):
+        # Write into another agent's replay buffer instead of keeping our own
+        self.learner = other
+        self.memory = other.memory
 
     def dynamic_epsilon_decay(self, reward):
         # Add the latest performance (1 for positive reward, 0 for negative)
@@ -165,6 +235,27 @@ class Agent:
     def calculate_n_step_return(self):
         return sum([self.gamma**i * transition[2] for i, transition in enumerate(self.n_step_buffer)])
 
+    def scalar_state(self):
+        # Plain values saved in a checkpoint manifest next to the network weights
+        return {
+            'input_size': self.input_size,
+            'hidden_size': self.hidden_size,
+            'output_size': self.policy_net.fc3.out_features,
+            'action_repeat': self.action_repeat,
+            'epsilon': self.epsilon,
+            'beta': self.beta,
+            'rebounds': self.rebounds,
+            'last_reward': self.last_reward,
+            'performance_window': list(self.performance_window),
+        }
+
+    def load_scalar_state(self, state):
+        self.epsilon = state['epsilon']
+        self.beta = state['beta']
+        self.rebounds = state.get('rebounds', 0)
+        self.last_reward = state.get('last_reward')
+        self.performance_window.extend(state.get('performance_window', []))
+
     def train(self, state, action, next_state, reward, done):
         # Implement the training logic here
         # For now, we'll just pass to avoid the AttributeError
@@ -178,6 +269,19 @@ class PrioritizedReplayBuffer:
         self.priorities = np.zeros((capacity,), dtype=np.float32)
         self.position = 0
         self.critical_moment_bonus = 2.0
+        # Rows can arrive from a background loader while the game adds new ones
+        self.lock = threading.Lock()
+        self.warmup_rows = 0  # Rows a background load must deliver before sampling starts
+        self.loaded_rows = 0
+        # Incremental checkpoints only write rows and priorities changed since the last one
+        self.total_added = 0
+        self.persisted_total = 0
+        self.dirty = set()  # Indices whose priority changed since the last snapshot
+        self.segments = []  # Saved segments that rebuild this buffer, oldest first
+        # Segment files of every buffer share one directory, so names carry a per-buffer id
+        self.segment_prefix = uuid.uuid4().hex[:12]
+        self.segment_count = 0
+        self.failed_segments = set()  # Segments whose save failed; snapshots still listing them are void
 
     def add(self, priority, experience):
         state, action, reward, next_state = experience
@@ -189,18 +293,74 @@ class PrioritizedReplayBuffer:
         # Add a small constant to prevent zero priority
         priority = max(priority, 1e-5)
         
-        if len(self.buffer) < self.capacity:
-            self.buffer.append(experience)
-        else:
-            self.buffer[self.position] = experience
-        self.priorities[self.position] = priority
-        self.position = (self.position + 1) % self.capacity
+        with self.lock:
+            if len(self.buffer) < self.capacity:
+                self.buffer.append(experience)
+            else:
+                self.buffer[self.position] = experience
+            self.priorities[self.position] = priority
+            self.position = (self.position + 1) % self.capacity
+            self.total_added += 1
+
+    def reserve(self, length, position, segments):
+        # Placeholder rows keep saved rows at their original indices while they load;
+        # with zero priority they are never sampled
+        with self.lock:
+            self.buffer = [None] * length
+            self.priorities[:length] = 0
+            self.position = position
+            self.total_added = 0
+            self.persisted_total = 0
+            self.dirty.clear()
+            self.segments = list(segments)
+
+    def fill(self, start, experiences, priorities):
+        # Write saved rows back at their indices, wrapping like the ring buffer
+        with self.lock:
+            index = start
+            for experience in experiences:
+                self.buffer[index] = experience
+                index = (index + 1) % self.capacity
+            indices = (start + np.arange(len(priorities))) % self.capacity
+            self.priorities[indices] = priorities
+            self.loaded_rows += len(experiences)
+
+    def drop_placeholders(self):
+        # A load that failed part way leaves placeholder rows; keep the real ones, oldest
+        # first, and write them all on the next save since no segment matches them now
+        with self.lock:
+            if len(self.buffer) == self.capacity:
+                order = np.roll(np.arange(self.capacity), -self.position)
+            else:
+                order = np.arange(len(self.buffer))
+            order = [index for index in order if self.buffer[index] is not None]
+            self.buffer = [self.buffer[index] for index in order]
+            self.priorities[:len(order)] = self.priorities[order]
+            self.priorities[len(order):] = 0
+            self.position = len(self.buffer) % self.capacity
+            self.persisted_total = self.total_added - len(self.buffer)
+            self.dirty.clear()
+            self.segments = []
+
+    def begin_loading(self, total_rows, warmup_fraction):
+        self.loaded_rows = 0
+        self.warmup_rows = int(total_rows * warmup_fraction)
+
+    def finish_loading(self):
+        self.warmup_rows = 0
+
+    def is_warm(self):
+        return self.loaded_rows >= self.warmup_rows
 
     def sample(self, batch_size, beta):
+        with self.lock:
+            return self._sample(batch_size, beta)
+
+    def _sample(self, batch_size, beta):
         if len(self.buffer) == self.capacity:
             priorities = self.priorities
         else:
-            priorities = self.priorities[:self.position]
+            priorities = self.priorities[:len(self.buffer)]
 
         probabilities = priorities ** self.alpha
         probabilities /= probabilities.sum()
@@ -216,6 +376,79 @@ class PrioritizedReplayBuffer:
 
     def update(self, index, priority):
         self.priorities[index] = priority
+        self.dirty.add(int(index))
+
+    def snapshot(self, segment_name=None):
+        """Rows added and priorities changed since the last snapshot, plus the segments holding the rest"""
+        with self.lock:
+            new_rows = min(self.total_added - self.persisted_total, len(self.buffer))
+            start = (self.position - new_rows) % self.capacity
+            indices = (start + np.arange(new_rows)) % self.capacity
+            delta_indices = np.fromiter(self.dirty, dtype=np.int64, count=len(self.dirty))
+            snapshot = {
+                'memory': self,
+                'buffer': self.buffer,
+                'start': start,
+                'count': new_rows,
+                'priorities': self.priorities[indices],
+                'delta_indices': delta_indices,
+                'delta_values': self.priorities[delta_indices],
+                'length': len(self.buffer),
+                'position': self.position,
+                'segment': None,
+            }
+            if new_rows or len(delta_indices):
+                if segment_name is None:
+                    segment_name = f'segment_{self.segment_prefix}_{self.segment_count:04d}'
+                    self.segment_count += 1
+                snapshot['segment'] = segment_name
+                self.segments = self.segments + [segment_name]
+            snapshot['segments'] = self.segments
+            self.persisted_total = self.total_added
+            self.dirty.clear()
+            return snapshot
+
+    def forget_saved(self):
+        # The saved segments were deleted, so the next snapshot has to write every row again
+        with self.lock:
+            self.persisted_total = self.total_added - len(self.buffer)
+            self.dirty.clear()
+            self.segments = []
+
+    def discard_snapshot(self, snapshot):
+        # A snapshot that failed to write is folded back into the next one
+        with self.lock:
+            self.persisted_total -= snapshot['count']
+            self.dirty.update(snapshot['delta_indices'].tolist())
+            if snapshot['segment']:
+                self.failed_segments.add(snapshot['segment'])
+            if snapshot['segment'] in self.segments:
+                self.segments = [name for name in self.segments if name != snapshot['segment']]
+
+    @staticmethod
+    def snapshot_to_segment(snapshot):
+        # Column arrays for the new rows, used for checkpoint segments
+        buffer = snapshot['buffer']
+        rows = [buffer[(snapshot['start'] + i) % len(buffer)] for i in range(snapshot['count'])]
+        if rows:
+            states, actions, rewards, next_states = zip(*rows)
+        else:
+            states = next_states = np.zeros((0, 0))
+            actions = rewards = ()
+        return {
+            'start': np.int64(snapshot['start']),
+            'states': np.asarray(states, dtype=np.float32),
+            'actions': np.asarray(actions, dtype=np.int64),
+            'rewards': np.asarray(rewards, dtype=np.float32),
+            'next_states': np.asarray(next_states, dtype=np.float32),
+            'priorities': snapshot['priorities'],
+            'delta_indices': snapshot['delta_indices'],
+            'delta_values': snapshot['delta_values'],
+        }
+
+    def apply_priority_delta(self, indices, values):
+        with self.lock:
+            self.priorities[indices] = values
 
     def __len__(self):
         return len(self.buffer)
@@ -3,9 +3,9 @@ from .random_agent import RandomAgent
 
 class AIFactory:
     @staticmethod
-    def create_agent(agent_type, settings):
+    def create_agent(agent_type, settings, learner=None):
         if agent_type == "dqn":
-            return Agent(settings)
+            return Agent(settings, learner)
         elif agent_type == "random":
             return RandomAgent(settings)
         else:
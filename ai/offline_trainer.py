@@ -0,0 +1,172 @@
+import argparse
+import os
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from ai.agent import Agent
+from game.game_instance import GameInstance
+from game.match_recorder import load_match_logs
+from utils import checkpoint
+from utils.settings import Settings
+
+
+def build_observations(log, side):
+    """Vectorized GameInstance.get_state for every record of a match log.
+
+    Side 1 gets agent1's view; side 2 gets agent2's mirrored view, the same frame
+    of reference the shared replay buffer uses, so both can train one network.
+    """
+    ball_x = log['ball_x'].astype(np.float32)
+    ball_y = log['ball_y'].astype(np.float32)
+    ball_dx = log['ball_dx'].astype(np.float32)
+    ball_dy = log['ball_dy'].astype(np.float32)
+    paddle1_y = log['paddle1_y'].astype(np.float32)
+    paddle2_y = log['paddle2_y'].astype(np.float32)
+
+    # predict_ball_position towards the observing paddle
+    target_x = log.paddle1_x if side == 1 else log.paddle2_x
+    safe_dx = np.where(ball_dx != 0, ball_dx, 1)
+    time_to_reach = np.where(ball_dx != 0, (target_x - ball_x) / safe_dx, 0)
+    predicted_x = ball_x + ball_dx * time_to_reach
+    predicted_y = ball_y + ball_dy * time_to_reach
+
+    observations = np.empty((len(log), 11), dtype=np.float32)
+    if side == 1:
+        observations[:, 0] = paddle1_y / log.height
+        observations[:, 1] = paddle2_y / log.height
+        observations[:, 2] = ball_x / log.width
+        observations[:, 4] = ball_dx / log.width
+        observations[:, 6] = predicted_x / log.width
+    else:
+        observations[:, 0] = paddle2_y / log.height
+        observations[:, 1] = paddle1_y / log.height
+        observations[:, 2] = 1 - ball_x / log.width
+        observations[:, 4] = -ball_dx / log.width
+        observations[:, 6] = 1 - predicted_x / log.width
+    observations[:, 3] = ball_y / log.height
+    observations[:, 5] = ball_dy / log.height
+    observations[:, 7] = predicted_y / log.height
+    observations[:, 8] = log['time_since_last_hit'] / 100
+    observations[:, 9] = log['difficulty']
+    observations[:, 10] = log['last_hit'] == side
+    return observations
+
+
+def build_dataset(logs, sides):
+    # Record t holds the state after tick t, so tick t's transition is (state t-1, action t, reward t, state t)
+    observations, actions, rewards, valid = [], [], [], []
+    for log in logs:
+        if len(log) < 2:
+            continue
+        consecutive = np.zeros(len(log), dtype=bool)
+        consecutive[1:] = np.diff(log['tick'].astype(np.int64)) == 1
+        for side in sides:
+            observations.append(build_observations(log, side))
+            actions.append(np.asarray(log[f'action{side}'], dtype=np.int64))
+            rewards.append(np.asarray(log[f'reward{side}'], dtype=np.float32))
+            valid.append(consecutive)
+
+    observations = np.concatenate(observations)
+    actions = np.concatenate(actions)
+    rewards = np.concatenate(rewards)
+    transitions = np.flatnonzero(np.concatenate(valid))
+    return observations, actions, rewards, transitions
+
+
+def train(agent, dataset, steps, batch_size, target_update, log_interval):
+    observations, actions, rewards, transitions = dataset
+    device = agent.device
+    observations = torch.from_numpy(observations).to(device)
+    actions = torch.from_numpy(actions).to(device)
+    rewards = torch.from_numpy(rewards).to(device)
+    transitions = torch.from_numpy(transitions).to(device)
+
+    start = time.perf_counter()
+    for step in range(1, steps + 1):
+        batch = transitions[torch.randint(len(transitions), (batch_size,), device=device)]
+        states = observations[batch - 1]
+        next_states = observations[batch]
+        batch_actions = actions[batch]
+        batch_rewards = rewards[batch]
+
+        current_q_values = agent.policy_net(states).gather(1, batch_actions.unsqueeze(1)).squeeze(1)
+        with torch.no_grad():
+            # Double DQN, as in Agent.learn
+            next_actions = agent.policy_net(next_states).max(1)[1].unsqueeze(1)
+            next_q_values = agent.target_net(next_states).gather(1, next_actions).squeeze(1)
+            expected_q_values = batch_rewards + agent.gamma * next_q_values
+        loss = nn.functional.smooth_l1_loss(current_q_values, expected_q_values)
+
+        agent.optimizer.zero_grad()
+        loss.backward()
+        agent.optimizer.step()
+
+        if step % target_update == 0:
+            agent.update_target_network()
+        if step % log_interval == 0 or step == steps:
+            elapsed = time.perf_counter() - start
+            print(f"step {step}/{steps}  loss {loss.item():.4f}  {step / elapsed:.0f} steps/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a DQN agent from recorded match logs")
+    parser.add_argument('recordings', nargs='?', default='recordings', help="directory of match_*.bin logs")
+    parser.add_argument('--save-directory', default='saves', help="where the new generation is written")
+    parser.add_argument('--sides', choices=['1', '2', 'both'], default='both', help="which paddles to learn from")
+    parser.add_argument('--steps', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--target-update', type=int, default=500, help="steps between target network syncs")
+    parser.add_argument('--epsilon', type=float, default=0.05, help="exploration rate stored in the checkpoint")
+    parser.add_argument('--resume', action='store_true', help="start from the latest generation's weights")
+    parser.add_argument('--log-interval', type=int, default=1000)
+    args = parser.parse_args()
+
+    logs = load_match_logs(args.recordings)
+    if not logs:
+        parser.error(f"no match logs found in {args.recordings}")
+    sides = (1, 2) if args.sides == 'both' else (int(args.sides),)
+
+    os.makedirs(args.save_directory, exist_ok=True)
+    index = checkpoint.CheckpointIndex(args.save_directory)
+    latest = index.latest()
+    instance = None
+    if args.resume and latest:
+        # The replay comes along so the new generation keeps referencing its segments
+        instance = GameInstance.load(index.get_path(latest))
+        if not isinstance(instance.agent1, Agent):
+            parser.error(f"generation {latest['generation']}'s agent1 is not a DQN agent, nothing to resume")
+        agent = instance.agent1
+        settings = instance.settings
+    else:
+        settings = Settings(int(logs[0].width), int(logs[0].height))
+        agent = Agent(settings)
+
+    dataset = build_dataset(logs, sides)
+    print(f"{len(logs)} logs, {len(dataset[3])} transitions")
+    train(agent, dataset, args.steps, args.batch_size, args.target_update, args.log_interval)
+    agent.epsilon = args.epsilon
+
+    if instance is None or settings.shared_replay:
+        # Both paddles play the trained policy; agent2 sees the mirrored view it was trained on
+        settings.shared_replay = True
+        opponent = instance.agent2 if instance else Agent(settings, learner=agent)
+        opponent.policy_net.load_state_dict(agent.policy_net.state_dict())
+        opponent.target_net.load_state_dict(agent.target_net.state_dict())
+        opponent.epsilon = args.epsilon
+        if instance is None:
+            instance = GameInstance(agent, opponent, settings)
+            print("New checkpoint is policy-only: it has no replay buffer")
+    else:
+        print("Only agent1 was trained; agent2 and both replay buffers are kept from the resumed generation")
+
+    generation = (latest['generation'] if latest else 0) + 1
+    directory = os.path.join(args.save_directory, f'generation_{generation:04d}')
+    snapshot = instance.snapshot(generation)
+    checkpoint.write_snapshot(snapshot, directory)
+    index.add(directory, snapshot['manifest'])
+    print(f"Saved {directory}")
+
+
+if __name__ == "__main__":
+    main()
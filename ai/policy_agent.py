@@ -0,0 +1,39 @@
+import torch
+from .agent import DQN
+
+class PolicyAgent:
+    """Play-only DQN agent built from an inference export: no optimizer, target net or replay buffer"""
+
+    def __init__(self, settings, export):
+        self.settings = settings
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.input_size = export['input_size']
+        self.hidden_size = export['hidden_size']
+        self.policy_net = DQN(self.input_size, export['output_size'], self.hidden_size).to(self.device)
+        self.policy_net.load_state_dict(export['state_dict'])
+        self.policy_net.eval()
+        self.metadata = export['metadata']
+        # Policies trained with a shared replay buffer expect agent2's view mirrored
+        self.expects_mirrored = self.metadata.get('shared_replay', False)
+        self.epsilon = 0.0
+        self.action_repeat = self.metadata.get('action_repeat', 1)
+        self.last_reward = None
+
+    @classmethod
+    def load(cls, path, settings):
+        export = torch.load(path, map_location="cpu", weights_only=True)
+        return cls(settings, export)
+
+    def get_action(self, state):
+        with torch.no_grad():
+            state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
+            return self.policy_net(state_tensor).max(1)[1].item()
+
+    def update(self, state, action, reward, next_state):
+        self.last_reward = reward  # Nothing to learn, just keep the sidebar readout current
+
+    def get_network_activations(self, state):
+        with torch.no_grad():
+            state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
+            self.policy_net(state_tensor)
+            return self.policy_net.activations
@@ -5,6 +5,7 @@ class RandomAgent:
         self.settings = settings
         self.epsilon = 1.0
         self.memory = []
+        self.action_repeat = max(1, int(round(settings.action_repeat)))
 
     def get_action(self, state):
         return random.choice([0, 1, 2])
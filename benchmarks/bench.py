@@ -0,0 +1,268 @@
+import os
+# Headless: the UI benchmarks draw into an off-screen display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pygame
+import torch
+from ai.agent import Agent, PrioritizedReplayBuffer
+from game.game_instance import GameInstance
+from ui.game_ui import GameUI
+from utils.settings import Settings
+
+RESULTS_DIRECTORY = os.path.join('benchmarks', 'results')
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baseline.json')
+REPLAY_SIZES = [1000, 10000, 100000, 1000000, 10000000]
+WIDTH, HEIGHT = 1280, 720  # Fixed so network sizes match across machines
+
+
+def measure(func, min_time, setup=None, min_calls=5, max_calls=100000):
+    """Time func call by call until min_time has passed; setup runs untimed before each call"""
+    times = []
+    total = 0.0
+    while len(times) < min_calls or (total < min_time and len(times) < max_calls):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    times = np.array(times)
+    return {
+        'calls': len(times),
+        'median': float(np.median(times)),
+        'mean': float(times.mean()),
+        'p95': float(np.percentile(times, 95)),
+        'min': float(times.min()),
+    }
+
+
+def machine_info():
+    info = {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'cuda': torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        'pygame': pygame.version.ver,
+    }
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                        text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info['commit'] = None
+    return info
+
+
+def random_transitions(count):
+    states = np.random.rand(count, 11).astype(np.float32)
+    return [(states[i], np.random.randint(3), float(np.random.randn()), states[(i + 1) % count]) for i in range(count)]
+
+
+def filled_buffer(size, capacity=None, pool=1000):
+    """A replay buffer holding size rows, filled directly rather than through add()"""
+    memory = PrioritizedReplayBuffer(capacity=capacity or size, alpha=0.6)
+    # Rows repeat a small pool so even 1e7 rows cost only the list of references
+    transitions = random_transitions(min(size, pool))
+    memory.buffer = [transitions[i % len(transitions)] for i in range(size)]
+    memory.priorities[:size] = np.random.rand(size) + 1e-5
+    memory.position = size % memory.capacity
+    memory.total_added = size
+    return memory
+
+
+def new_instance(settings, replay_rows):
+    instance = GameInstance(Agent(settings), Agent(settings), settings)
+    for agent in (instance.agent1, instance.agent2):
+        agent.memory = filled_buffer(replay_rows, capacity=max(replay_rows * 10, 100000))
+    return instance
+
+
+def bench_game(settings, min_time):
+    instance = new_instance(settings, 10000)
+    results = {
+        'game_update': measure(instance.update, min_time),
+        'get_state': measure(lambda: instance.get_state(instance.paddle1, instance.paddle2), min_time),
+    }
+
+    agent = instance.agent1
+    state = instance.get_state(instance.paddle1, instance.paddle2)
+    next_state = instance.get_state(instance.paddle1, instance.paddle2, mirrored=True)
+    agent.epsilon = 0  # Always take the network path
+    results['agent_get_action'] = measure(lambda: agent.get_action(state), min_time)
+    results['agent_update'] = measure(lambda: agent.update(state, 1, 0.1, next_state), min_time)
+    return results
+
+
+def bench_replay(sizes, min_time):
+    results = {}
+    for size in sizes:
+        memory = filled_buffer(size)
+        transition = memory.buffer[0]
+        # Full buffers overwrite in place, the steady state of a long run
+        results[f'replay_add/{size}'] = measure(lambda: memory.add(1.0, transition), min_time)
+        results[f'replay_sample/{size}'] = measure(lambda: memory.sample(64, 0.4), min_time)
+        del memory
+    return results
+
+
+def bench_checkpoint(settings, replay_rows, min_time):
+    root = tempfile.mkdtemp(prefix='pong_bench_')
+    try:
+        instance = new_instance(settings, replay_rows)
+        saved = []
+
+        def forget_saved_rows():
+            # Every save writes the whole buffer, not just what changed since the last one
+            for agent in (instance.agent1, instance.agent2):
+                agent.memory.persisted_total = 0
+                agent.memory.segments = []
+            saved.append(os.path.join(root, f'generation_{len(saved) + 1:04d}'))
+
+        results = {
+            'save': measure(lambda: instance.save(saved[-1], len(saved)), min_time, setup=forget_saved_rows),
+            'load': measure(lambda: GameInstance.load(saved[-1]), min_time),
+        }
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_ui(settings, min_time):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    font = pygame.font.Font(None, int(HEIGHT * 0.03))
+    game_ui = GameUI(screen, font, settings)
+    instance = new_instance(settings, 1000)
+    for agent in (instance.agent1, instance.agent2):
+        agent.batch_size = len(agent.memory) + 1  # Only the drawing is timed; skip learning between frames
+
+    draw = lambda: game_ui.draw(instance, False, False)
+    results = {'ui_draw': measure(draw, min_time, setup=instance.update)}
+
+    def full_redraw():
+        instance.update()
+        game_ui.invalidate()
+    results['ui_draw_full'] = measure(draw, min_time, setup=full_redraw)
+
+    game_ui.show_network_agent1 = True
+    game_ui.invalidate()
+    results['ui_draw_network'] = measure(draw, min_time, setup=instance.update)
+    pygame.quit()
+    return results
+
+
+def run(args):
+    settings = Settings(WIDTH, HEIGHT)
+    settings.width, settings.height = WIDTH, HEIGHT
+    sizes = [size for size in args.sizes if not args.quick or size <= 100000]
+    min_time = 0.2 if args.quick else args.min_time
+
+    suites = [
+        ('game', lambda: bench_game(settings, min_time)),
+        ('replay', lambda: bench_replay(sizes, min_time)),
+        ('checkpoint', lambda: bench_checkpoint(settings, args.save_rows, min_time)),
+        ('ui', lambda: bench_ui(settings, min_time)),
+    ]
+    results = {}
+    for name, suite in suites:
+        if args.only and name not in args.only:
+            continue
+        print(f"Running {name} benchmarks...")
+        for benchmark, stats in suite().items():
+            results[benchmark] = stats
+            print(f"  {benchmark:<28} {format_time(stats['median']):>10} median  {format_time(stats['p95']):>10} p95  ({stats['calls']} calls)")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': machine_info(),
+        'options': {'quick': args.quick, 'min_time': min_time, 'sizes': sizes, 'save_rows': args.save_rows},
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIRECTORY, time.strftime('bench_%Y%m%d_%H%M%S.json'))
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        current = json.load(f)
+
+    for key in ('platform', 'processor', 'cpu_count', 'torch', 'cuda'):
+        if baseline['machine'].get(key) != current['machine'].get(key):
+            print(f"Warning: {key} differs ({baseline['machine'].get(key)} vs {current['machine'].get(key)}), timings may not be comparable")
+
+    regressions = []
+    for name, stats in current['results'].items():
+        if name not in baseline['results']:
+            print(f"  {name:<28} {format_time(stats['median']):>10}  (new)")
+            continue
+        before = baseline['results'][name]['median']
+        ratio = stats['median'] / before if before > 0 else float('inf')
+        flag = ''
+        if ratio > 1 + args.threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - args.threshold:
+            flag = 'faster'
+        print(f"  {name:<28} {format_time(before):>10} -> {format_time(stats['median']):>10}  {ratio:6.2f}x  {flag}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions")
+
+
+def format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation, learning and drawing hot paths")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the benchmarks and write the results as JSON")
+    run_parser.add_argument('--output', metavar='PATH', help=f"results file (default: a timestamped file in {RESULTS_DIRECTORY})")
+    run_parser.add_argument('--only', nargs='+', choices=['game', 'replay', 'checkpoint', 'ui'], help="run only these suites")
+    run_parser.add_argument('--sizes', nargs='+', type=lambda size: int(float(size)), default=REPLAY_SIZES,
+                            help="replay buffer sizes, e.g. 1e3 1e6")
+    run_parser.add_argument('--save-rows', type=int, default=100000, help="replay rows per agent in the save/load benchmarks")
+    run_parser.add_argument('--min-time', type=float, default=1.0, help="seconds spent timing each benchmark")
+    run_parser.add_argument('--quick', action='store_true', help="short timings and buffers up to 1e5 only")
+
+    compare_parser = commands.add_parser('compare', help="flag regressions against a stored baseline")
+    compare_parser.add_argument('results', help="results file to check")
+    compare_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help="slowdown of the median counted as a regression")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
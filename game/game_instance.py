@@ -1,11 +1,36 @@
 import pygame
 from game.paddle import Paddle
 from game.ball import Ball
+from game.match_recorder import FLAG_HIT1, FLAG_HIT2, FLAG_POINT
 from ai.agent import Agent
-import pickle
+from utils.settings import Settings
+from utils import checkpoint
+from utils.profiler import profiler
 import os
 import math
+import pickle
 import random
+import time
+import numpy as np
+
+def unmirror_observations(observations):
+    """Turn get_state rows seen from the left paddle into agent2's unmirrored view of the same court.
+
+    The unmirrored view predicts the ball where it meets paddle1, the left paddle,
+    so the prediction is redone from the flipped ball position and velocity.
+    """
+    observations = np.asarray(observations, dtype=np.float32)
+    flipped = observations.copy()
+    flipped[:, 2] = 1 - observations[:, 2]  # ball x
+    flipped[:, 4] = -observations[:, 4]  # ball dx
+    # The left view's prediction lies on its own paddle, which is where paddle1 sits
+    target_x = observations[:, 6]
+    moving = flipped[:, 4] != 0
+    time_to_reach = np.where(moving, (target_x - flipped[:, 2]) / np.where(moving, flipped[:, 4], 1), 0)
+    flipped[:, 6] = np.where(moving, target_x, flipped[:, 2])
+    flipped[:, 7] = observations[:, 3] + observations[:, 5] * time_to_reach
+    return flipped
+
 
 class GameInstance:
     def __init__(self, agent1, agent2, settings):
@@ -19,6 +44,7 @@ class GameInstance:
         self.score1 = 0
         self.score2 = 0
         self.events = []  # Store significant events for UI to display
+        self.ticks = 0  # Updates run, for steps-per-second metrics
         self.last_hit = None  # Track which paddle last hit the ball
         self.total_reward1 = 0
         self.total_reward2 = 0
@@ -41,6 +67,19 @@ class GameInstance:
         self.max_consecutive_misses = 5
         self.max_speed_increase = 2.0  # Maximum speed multiplier
         self.speed_increase_rate = 0.1  # Speed increase per consecutive hit
+        self.self_play_update_frequency = 1000  # Ticks between copies of agent1's policy into agent2
+
+        # Self-play with one learner: both perspectives feed agent1's replay buffer
+        self.shared_replay = settings.shared_replay and isinstance(agent1, Agent) and isinstance(agent2, Agent)
+        if self.shared_replay:
+            self.agent2.share_memory(self.agent1)
+        self.mirror_agent2 = self.shared_replay or getattr(agent2, 'expects_mirrored', False)
+        self.replay_loader = None  # Set while replay is still streaming in after a fast resume
+        self.recorder = None  # Optional MatchRecorder fed once per tick
+
+        # Pending decision per side for action repeat: [state, action, summed reward, ticks held]
+        self.decision1 = None
+        self.decision2 = None
 
         # Apply settings
         self.settings = settings
@@ -69,11 +108,20 @@ class GameInstance:
             self.ball.dy = math.sin(angle) * self.ball.speed
 
     def update(self):
-        state1 = self.get_state(self.paddle1, self.paddle2)
-        state2 = self.get_state(self.paddle2, self.paddle1)
-
-        action1 = self.agent1.get_action(state1)
-        action2 = self.agent2.get_action(state2)
+        self.ticks += 1
+        start = time.perf_counter()
+        # Agents only decide again once their previous action has been held for action_repeat ticks
+        if self.decision1 is None:
+            state1 = self.get_agent_state(1)
+            self.decision1 = [state1, self.agent1.get_action(state1), 0.0, 0]
+        if self.decision2 is None:
+            state2 = self.get_agent_state(2)
+            self.decision2 = [state2, self.agent2.get_action(state2), 0.0, 0]
+
+        action1 = self.decision1[1]
+        action2 = self.decision2[1]
+        profiler.record('inference', start)
+        start = time.perf_counter()
 
         self.paddle1.move(action1)
         self.paddle2.move(action2)
@@ -122,7 +170,8 @@ class GameInstance:
         if self.paddle1.collides_with(self.ball) or self.paddle2.collides_with(self.ball):
             self.time_since_last_hit = 0
 
-        if self.ball.is_out():
+        point_scored = self.ball.is_out()
+        if point_scored:
             if self.ball.x < self.settings.width / 2:
                 self.score2 += 1
                 reward1 -= 2.0  # Increased penalty for losing a point
@@ -139,11 +188,43 @@ class GameInstance:
                     self.agent2.reset_rebounds()
             self.reset_ball()  # Make sure this line is here
 
-        new_state1 = self.get_state(self.paddle1, self.paddle2)
-        new_state2 = self.get_state(self.paddle2, self.paddle1)
+        self.decision1[2] += reward1
+        self.decision1[3] += 1
+        self.decision2[2] += reward2
+        self.decision2[3] += 1
+
+        # A held action ends early when a point is scored so no transition spans a ball reset
+        transition1 = None
+        transition2 = None
+        if point_scored or self.decision1[3] >= self.agent1.action_repeat:
+            state1, action1, summed_reward1, _ = self.decision1
+            transition1 = (state1, action1, summed_reward1, self.get_agent_state(1))
+            self.decision1 = None
+        if point_scored or self.decision2[3] >= self.agent2.action_repeat:
+            state2, action2, summed_reward2, _ = self.decision2
+            transition2 = (state2, action2, summed_reward2, self.get_agent_state(2))
+            self.decision2 = None
+
+        profiler.record('physics', start)
+
+        if self.shared_replay:
+            if transition1:
+                self.agent1.remember(*transition1)
+            if transition2:
+                self.agent2.remember(*transition2)
+            if transition1 and self.agent1.learn():
+                self.agent1.dynamic_epsilon_decay(transition1[2])
+                if transition2:
+                    self.agent2.dynamic_epsilon_decay(transition2[2])
+        else:
+            if transition1:
+                self.agent1.update(*transition1)
+            if transition2:
+                self.agent2.update(*transition2)
 
-        self.agent1.update(state1, action1, reward1, new_state1)
-        self.agent2.update(state2, action2, reward2, new_state2)
+        # Done here rather than by the caller so games training in the background are synced too
+        if self.ticks % self.self_play_update_frequency == 0:
+            self.update_opponent_for_self_play()
 
         self.total_reward1 += reward1
         self.total_reward2 += reward2
@@ -164,6 +245,19 @@ class GameInstance:
         # Update difficulty based on whether a hit occurred
         self.update_difficulty(hit_occurred)
 
+        if self.recorder:
+            flags = 0
+            if hit_occurred:
+                flags |= FLAG_HIT1 if self.last_hit is self.paddle1 else FLAG_HIT2
+            if point_scored:
+                flags |= FLAG_POINT
+            self.recorder.record(self, action1, action2, reward1, reward2, flags)
+
+    def update_opponent_for_self_play(self):
+        if isinstance(self.agent1, Agent) and isinstance(self.agent2, Agent):
+            self.agent2.policy_net.load_state_dict(self.agent1.policy_net.state_dict())
+            self.events.append("Updated opponent for self-play")
+
     def reward_energy_conservation(self, paddle):
         # Calculate the energy conservation reward
         current_distance = self._get_paddle_ball_distance(paddle)
@@ -235,48 +329,140 @@ class GameInstance:
     def _get_paddle_ball_distance(self, paddle):
         return math.sqrt((paddle.x - self.ball.x)**2 + (paddle.y + paddle.height/2 - self.ball.y)**2)
 
-    def get_state(self, paddle, opponent_paddle):
-        predicted_x, predicted_y = self.predict_ball_position()
+    def get_states(self):
+        return self.get_agent_state(1), self.get_agent_state(2)
+
+    def thumbnail(self):
+        # Positions as fractions of the court, all a dashboard thumbnail needs
+        width, height = self.settings.width, self.settings.height
+        return (self.ball.x / width, self.ball.y / height,
+                self.paddle1.y / height, self.paddle2.y / height, self.paddle1.height / height)
+
+    def get_agent_state(self, agent_number):
+        # With a shared replay buffer agent2 sees the court mirrored, so both
+        # sides produce observations from the same (left paddle) point of view
+        if agent_number == 1:
+            return self.get_state(self.paddle1, self.paddle2)
+        return self.get_state(self.paddle2, self.paddle1, mirrored=self.mirror_agent2)
+
+    def get_state(self, paddle, opponent_paddle, mirrored=False):
+        if mirrored:
+            predicted_x, predicted_y = self.predict_ball_position(paddle.x)
+            ball_x = 1 - self.ball.x / self.settings.width
+            ball_dx = -self.ball.dx / self.settings.width
+            predicted_x = 1 - predicted_x / self.settings.width
+        else:
+            predicted_x, predicted_y = self.predict_ball_position()
+            ball_x = self.ball.x / self.settings.width
+            ball_dx = self.ball.dx / self.settings.width
+            predicted_x = predicted_x / self.settings.width
         return [
             paddle.y / self.settings.height,
             opponent_paddle.y / self.settings.height,
-            self.ball.x / self.settings.width,
+            ball_x,
             self.ball.y / self.settings.height,
-            self.ball.dx / self.settings.width,
+            ball_dx,
             self.ball.dy / self.settings.height,
-            predicted_x / self.settings.width,
+            predicted_x,
             predicted_y / self.settings.height,
             self.time_since_last_hit / 100,  # Normalize to a reasonable range
             self.difficulty,
             1 if self.last_hit == paddle else 0  # Indicate if this paddle last hit the ball
         ]
 
-    def predict_ball_position(self):
+    def predict_ball_position(self, target_x=None):
         # Simple linear prediction
-        time_to_reach = (self.paddle1.x - self.ball.x) / self.ball.dx if self.ball.dx != 0 else 0
+        if target_x is None:
+            target_x = self.paddle1.x
+        time_to_reach = (target_x - self.ball.x) / self.ball.dx if self.ball.dx != 0 else 0
         predicted_x = self.ball.x + self.ball.dx * time_to_reach
         predicted_y = self.ball.y + self.ball.dy * time_to_reach
         return predicted_x, predicted_y
 
-    def save(self, filename):
-        save_data = {
-            'agent1': self.agent1,
-            'agent2': self.agent2,
-            'score1': self.score1,
-            'score2': self.score2,
-            'settings': self.settings,
-            'total_reward1': self.total_reward1,
-            'total_reward2': self.total_reward2
+    def snapshot(self, generation=None):
+        # Taken on the game thread; everything slow happens in checkpoint.write_snapshot
+        return {
+            'manifest': {
+                'format_version': checkpoint.FORMAT_VERSION,
+                'generation': generation,
+                'timestamp': time.time(),
+                'score1': self.score1,
+                'score2': self.score2,
+                'total_reward1': self.total_reward1,
+                'total_reward2': self.total_reward2,
+                'rating': self.get_performance_ratio(),
+                'width': self.settings.width,
+                'height': self.settings.height,
+                'settings': self.settings.to_dict(),
+                'shared_replay': self.shared_replay,
+            },
+            'agents': {
+                'agent1': checkpoint.snapshot_agent(self.agent1),
+                # A shared buffer is stored once, with agent1
+                'agent2': checkpoint.snapshot_agent(self.agent2, include_replay=not self.shared_replay),
+            },
         }
-        with open(filename, 'wb') as f:
-            pickle.dump(save_data, f)
+
+    def save(self, directory, generation=None):
+        checkpoint.write_snapshot(self.snapshot(generation), directory)
+
+    @classmethod
+    def load(cls, directory, load_optimizer=True, load_replay=True, background_replay=False, replay_warmup_fraction=0.1):
+        # With background_replay the game can start as soon as the networks are loaded;
+        # agents begin learning once replay_warmup_fraction of their buffer has streamed in
+        manifest = checkpoint.read_manifest(directory)
+        if manifest.get('format_version', 0) > checkpoint.FORMAT_VERSION:
+            raise ValueError(f"{os.path.basename(directory)} uses checkpoint format {manifest['format_version']}, "
+                             f"this version reads up to {checkpoint.FORMAT_VERSION}")
+        if load_replay:
+            # Checked up front, since background loading would only find out after the game started
+            missing = checkpoint.missing_segments(directory, manifest)
+            if missing:
+                raise FileNotFoundError(f"{os.path.basename(directory)} is missing replay segments: {', '.join(missing)}")
+
+        settings = Settings(manifest['width'], manifest['height'])
+        for key, value in manifest['settings'].items():
+            setattr(settings, key, value)
+
+        agents = manifest['agents']
+        load_now = load_replay and not background_replay
+        agent1 = checkpoint.load_agent(os.path.join(directory, 'agent1'), agents['agent1'], settings,
+                                       load_optimizer, load_now)
+        # A shared-replay agent2 writes into agent1's buffer
+        learner = agent1 if manifest['shared_replay'] and isinstance(agent1, Agent) else None
+        agent2 = checkpoint.load_agent(os.path.join(directory, 'agent2'), agents['agent2'], settings,
+                                       load_optimizer, load_now, learner)
+
+        instance = cls(agent1, agent2, settings)
+        instance.score1 = manifest['score1']
+        instance.score2 = manifest['score2']
+        instance.total_reward1 = manifest.get('total_reward1', 0)
+        instance.total_reward2 = manifest.get('total_reward2', 0)
+
+        if load_replay and background_replay:
+            jobs = []
+            replay_root = checkpoint.get_replay_root(directory)
+            for name, agent in (('agent1', agent1), ('agent2', agent2)):
+                if 'replay' in agents[name]:
+                    jobs.append((agent.memory, os.path.join(replay_root, name), agents[name]['replay']))
+            if jobs:
+                instance.replay_loader = checkpoint.ReplayLoader(jobs, replay_warmup_fraction)
+        return instance
 
     @classmethod
-    def load(cls, filename):
+    def load_legacy(cls, filename):
+        """Rebuild a game from a legacy generation_*.pkl save; the file itself is left alone"""
         with open(filename, 'rb') as f:
             save_data = pickle.load(f)
-        
-        instance = cls(save_data['agent1'], save_data['agent2'], save_data['settings'])
+
+        old_settings = save_data['settings']
+        settings = Settings(old_settings.width, old_settings.height)
+        for key, value in vars(old_settings).items():
+            setattr(settings, key, value)
+
+        agent1 = checkpoint.convert_legacy_agent(save_data['agent1'], settings)
+        agent2 = checkpoint.convert_legacy_agent(save_data['agent2'], settings)
+        instance = cls(agent1, agent2, settings)
         instance.score1 = save_data['score1']
         instance.score2 = save_data['score2']
         instance.total_reward1 = save_data.get('total_reward1', 0)
@@ -1,12 +1,22 @@
 import pygame
+from ai.agent import PrioritizedReplayBuffer
 
 class HumanPlayer:
-    def __init__(self, settings):
+    def __init__(self, settings, record_demonstrations=False):
         self.settings = settings
         self.paddle_speed = settings.paddle_speed
         self.move_up = False
         self.move_down = False
         self.last_reward = 0  # Add this line
+        self.action_repeat = 1  # Keyboard input is sampled every tick
+        # Demonstrations are kept in agent1's (left paddle) point of view on either side
+        self.expects_mirrored = True
+        self.demonstrations = None
+        if record_demonstrations:
+            self.start_demonstrations()
+
+    def start_demonstrations(self):
+        self.demonstrations = PrioritizedReplayBuffer(capacity=1000000, alpha=0.6)
 
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
@@ -30,7 +40,8 @@ class HumanPlayer:
 
     def update(self, state, action, reward, next_state):
         self.last_reward = reward  # Update this method to store the last reward
-        pass  # Human player doesn't need to learn
+        if self.demonstrations is not None:
+            self.demonstrations.add(1.0, (state, action, reward, next_state))
 
     def get_network_activations(self, state):
         return None  # Human player doesn't have a neural network
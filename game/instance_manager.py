@@ -0,0 +1,83 @@
+import time
+from ai.agent import Agent
+
+# Rough size of one replay transition: two 11-float state arrays plus the tuple holding them
+TRANSITION_BYTES = 500
+
+
+class InstanceManager:
+    """Keeps several GameInstances running round-robin alongside the focused one.
+
+    Background instances are stepped for a fixed time budget per frame. When there
+    are too many, or their replay buffers pass the memory cap, the ones focused
+    least recently are evicted.
+    """
+
+    def __init__(self, max_instances=8, memory_cap=2 * 1024 ** 3):
+        self.max_instances = max_instances
+        self.memory_cap = memory_cap
+        self.instances = []
+        self.last_focused = {}  # instance -> time it was last in focus
+        # Steps are read from GameInstance.ticks, so paused frames never count
+        self.start_ticks = {}  # instance -> its ticks when it was added
+        self.removed_steps = 0  # Steps run by instances no longer managed
+        self.next_index = 0  # Round-robin position
+
+    def add(self, instance):
+        self.instances.append(instance)
+        self.last_focused[instance] = time.time()
+        self.start_ticks[instance] = instance.ticks
+        return self.evict(keep=instance)
+
+    def remove(self, instance):
+        if instance in self.last_focused:
+            self.instances.remove(instance)
+            del self.last_focused[instance]
+            self.removed_steps += instance.ticks - self.start_ticks.pop(instance)
+
+    def focus(self, instance):
+        self.last_focused[instance] = time.time()
+
+    def step(self, budget, exclude=None):
+        """Update background instances in turn until budget seconds have passed"""
+        background = [instance for instance in self.instances if instance is not exclude]
+        if not background:
+            return 0
+        deadline = time.perf_counter() + budget
+        steps = 0
+        while time.perf_counter() < deadline:
+            self.next_index %= len(background)
+            instance = background[self.next_index]
+            instance.update()
+            # Nobody shows a background instance's events, so they are dropped
+            instance.events.clear()
+            self.next_index += 1
+            steps += 1
+        return steps
+
+    def get_steps(self):
+        # instance -> steps run since it was added
+        return {instance: instance.ticks - start for instance, start in self.start_ticks.items()}
+
+    def total_steps(self):
+        # Steps across all instances, removed ones included
+        return self.removed_steps + sum(self.get_steps().values())
+
+    def memory_usage(self):
+        # Replay buffers dominate; a buffer shared by both agents is counted once
+        buffers = {}
+        for instance in self.instances:
+            for agent in (instance.agent1, instance.agent2):
+                if isinstance(agent, Agent):
+                    buffers[id(agent.memory)] = len(agent.memory)
+        return sum(buffers.values()) * TRANSITION_BYTES
+
+    def evict(self, keep=None):
+        """Drop the least recently focused instances while over the instance count or memory cap"""
+        evicted = []
+        while len(self.instances) > 1 and (len(self.instances) > self.max_instances or self.memory_usage() > self.memory_cap):
+            candidates = [instance for instance in self.instances if instance is not keep]
+            oldest = min(candidates, key=lambda instance: self.last_focused[instance])
+            self.remove(oldest)
+            evicted.append(oldest)
+        return evicted
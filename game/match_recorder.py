@@ -0,0 +1,142 @@
+import glob
+import os
+import struct
+import time
+import numpy as np
+
+# Match logs are a 64-byte header followed by fixed-width little-endian records, one per tick.
+# Each record holds the state after the tick plus the actions and rewards that produced it.
+MAGIC = b'PONGLOG1'
+VERSION = 1
+HEADER_SIZE = 64
+HEADER_FORMAT = '<8sIIffffff'  # magic, version, record size, width, height, paddle1 x, paddle2 x, paddle height, ball size
+
+RECORD_DTYPE = np.dtype([
+    ('tick', '<u8'),
+    ('ball_x', '<f4'),
+    ('ball_y', '<f4'),
+    ('ball_dx', '<f4'),
+    ('ball_dy', '<f4'),
+    ('paddle1_y', '<f4'),
+    ('paddle2_y', '<f4'),
+    ('action1', 'u1'),
+    ('action2', 'u1'),
+    ('flags', 'u1'),
+    ('last_hit', 'u1'),  # 0: nobody yet, 1: paddle 1, 2: paddle 2
+    ('reward1', '<f4'),
+    ('reward2', '<f4'),
+    ('score1', '<u4'),
+    ('score2', '<u4'),
+    ('time_since_last_hit', '<u4'),
+    ('difficulty', '<f4'),
+])
+
+FLAG_HIT1 = 1
+FLAG_HIT2 = 2
+FLAG_POINT = 4
+
+
+class MatchRecorder:
+    """Streams ticks of a GameInstance into rotating binary match logs"""
+
+    def __init__(self, directory, settings, max_bytes=64 * 1024 * 1024, chunk_records=4096):
+        self.directory = directory
+        self.settings = settings
+        self.max_bytes = max_bytes
+        self.session = time.strftime('%Y%m%d_%H%M%S')
+        self.part = 0
+        self.file = None
+        self.file_bytes = 0
+        # Records are staged in a preallocated array and written a chunk at a time
+        self.chunk = np.zeros(chunk_records, dtype=RECORD_DTYPE)
+        self.count = 0
+        self.tick = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, game, action1, action2, reward1, reward2, flags):
+        if game.last_hit is None:
+            last_hit = 0
+        else:
+            last_hit = 1 if game.last_hit is game.paddle1 else 2
+        self.chunk[self.count] = (
+            self.tick, game.ball.x, game.ball.y, game.ball.dx, game.ball.dy,
+            game.paddle1.y, game.paddle2.y, action1, action2, flags, last_hit,
+            reward1, reward2, game.score1, game.score2, game.time_since_last_hit, game.difficulty,
+        )
+        self.tick += 1
+        self.count += 1
+        if self.count == len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        if self.count == 0:
+            return
+        if self.file is None or self.file_bytes >= self.max_bytes:
+            self._open_next_file()
+        data = self.chunk[:self.count].tobytes()
+        self.file.write(data)
+        self.file_bytes += len(data)
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _open_next_file(self):
+        if self.file:
+            self.file.close()
+        self.part += 1
+        path = os.path.join(self.directory, f'match_{self.session}_{self.part:03d}.bin')
+        self.file = open(path, 'wb', buffering=1024 * 1024)
+        paddle = self._paddle_geometry()
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_DTYPE.itemsize,
+                             self.settings.width, self.settings.height, *paddle)
+        self.file.write(header.ljust(HEADER_SIZE, b'\0'))
+        self.file_bytes = HEADER_SIZE
+
+    def _paddle_geometry(self):
+        # Same formulas as Paddle and Ball, so readers can rebuild positions without a game
+        paddle_width = int(self.settings.width * 0.02)
+        return (
+            paddle_width,
+            self.settings.width - paddle_width * 2,
+            int(self.settings.height * 0.2),
+            int(min(self.settings.width, self.settings.height) * 0.02),
+        )
+
+
+class MatchLog:
+    """Read-only view of a match log; columns come back as memory-mapped NumPy arrays"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        (magic, version, record_size, self.width, self.height,
+         self.paddle1_x, self.paddle2_x, self.paddle_height, self.ball_size) = struct.unpack_from(HEADER_FORMAT, header)
+        if magic != MAGIC or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Not a supported match log: {path}")
+        self.version = version
+
+        # A crash can leave a partial record at the end; it is ignored
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, column):
+        return self.records[column]
+
+
+def list_match_logs(directory):
+    return sorted(glob.glob(os.path.join(directory, 'match_*.bin')))
+
+
+def load_match_logs(directory):
+    return [MatchLog(path) for path in list_match_logs(directory)]
@@ -0,0 +1,137 @@
+import os
+import numpy as np
+from game.ball import Ball
+from game.paddle import Paddle
+from game.match_recorder import MatchLog, list_match_logs, FLAG_HIT1, FLAG_HIT2, FLAG_POINT
+from utils.settings import Settings
+
+
+class ReplayAgent:
+    """Stand-in for an agent while watching a recording"""
+
+    def __init__(self):
+        self.last_reward = None
+        self.last_action = None
+
+
+class ReplayInstance:
+    """Plays a recorded match through GameUI without agents or physics.
+
+    Exposes the attributes GameUI.draw reads from a GameInstance, filled from
+    the log at the current playback position.
+    """
+
+    ticks_per_second = 60  # 1x speed matches the live game loop
+    max_speed = 64
+
+    def __init__(self, paths):
+        self.logs = [MatchLog(path) for path in paths]
+        self.logs = [log for log in self.logs if len(log) > 0]
+        if not self.logs:
+            raise ValueError("Recording is empty")
+        first = self.logs[0]
+        self.settings = Settings(int(first.width), int(first.height))
+        self.paddle1 = Paddle(self.settings, side="left")
+        self.paddle2 = Paddle(self.settings, side="right")
+        self.ball = Ball(self.settings)
+        self.glow_intensity = self.settings.glow_intensity
+        self.show_trails = self.settings.show_trails
+        self.trail_length = self.settings.trail_length
+        self.agent1 = ReplayAgent()
+        self.agent2 = ReplayAgent()
+
+        # Rotated files are addressed as one timeline through their start offsets
+        lengths = [len(log) for log in self.logs]
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self.length = int(sum(lengths))
+        self.keyframes = np.concatenate([np.flatnonzero(log['flags'] & FLAG_POINT) + offset
+                                         for log, offset in zip(self.logs, self.offsets)])
+        # Running hit counts so any position can be shown without replaying from the start
+        self.hits1 = [np.cumsum((log['flags'] & FLAG_HIT1) != 0, dtype=np.uint32) for log in self.logs]
+        self.hits2 = [np.cumsum((log['flags'] & FLAG_HIT2) != 0, dtype=np.uint32) for log in self.logs]
+        self.hit_offsets1 = np.concatenate(([0], np.cumsum([hits[-1] for hits in self.hits1])[:-1]))
+        self.hit_offsets2 = np.concatenate(([0], np.cumsum([hits[-1] for hits in self.hits2])[:-1]))
+
+        self.position = 0.0
+        self.speed = 1
+        self.paused = False
+        self.events = []
+        self.total_reward1 = 0
+        self.total_reward2 = 0
+        self.seek(0)
+
+    @classmethod
+    def from_path(cls, path):
+        # A directory plays its most recent session, with all of its rotated parts
+        if os.path.isdir(path):
+            logs = list_match_logs(path)
+            if not logs:
+                raise ValueError(f"No match logs in {path}")
+            session = os.path.basename(logs[-1]).rsplit('_', 1)[0]
+            paths = [log for log in logs if os.path.basename(log).rsplit('_', 1)[0] == session]
+        else:
+            paths = [path]
+        return cls(paths)
+
+    def update(self, time_delta):
+        if self.paused:
+            return
+        self.position = min(self.position + self.speed * self.ticks_per_second * time_delta, self.length - 1)
+        self._apply(int(self.position))
+
+    def seek(self, index):
+        self.position = float(min(max(index, 0), self.length - 1))
+        self._apply(int(self.position))
+
+    def seek_seconds(self, seconds):
+        self.seek(int(self.position) + int(seconds * self.ticks_per_second))
+
+    def change_speed(self, factor):
+        self.speed = int(min(max(self.speed * factor, 1), self.max_speed))
+
+    def next_keyframe(self):
+        later = self.keyframes[self.keyframes > int(self.position)]
+        self.seek(later[0] if len(later) else self.length - 1)
+
+    def previous_keyframe(self):
+        # Step back past the point we may be sitting on
+        earlier = self.keyframes[self.keyframes < int(self.position) - 1]
+        self.seek(earlier[-1] if len(earlier) else 0)
+
+    def get_status(self):
+        seconds = int(self.position) // self.ticks_per_second
+        total = self.length // self.ticks_per_second
+        return f"Replay {seconds // 60}:{seconds % 60:02d} / {total // 60}:{total % 60:02d}  {self.speed}x"
+
+    def get_confidence(self):
+        return 1.0, 1.0
+
+    def get_performance_ratio(self):
+        # Same weighting as GameInstance.update_performance_scores
+        performance1 = self.score1 + self.total_hits1 * 0.1
+        performance2 = self.score2 + self.total_hits2 * 0.1
+        if performance1 + performance2 == 0:
+            return 0.5
+        return performance1 / (performance1 + performance2)
+
+    def _apply(self, index):
+        log_index = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        local = index - int(self.offsets[log_index])
+        record = self.logs[log_index].records[local]
+
+        self.ball.x = float(record['ball_x'])
+        self.ball.y = float(record['ball_y'])
+        self.ball.dx = float(record['ball_dx'])
+        self.ball.dy = float(record['ball_dy'])
+        self.paddle1.y = float(record['paddle1_y'])
+        self.paddle2.y = float(record['paddle2_y'])
+        self.score1 = int(record['score1'])
+        self.score2 = int(record['score2'])
+        self.difficulty = float(record['difficulty'])
+        self.time_since_last_hit = int(record['time_since_last_hit'])
+        self.agent1.last_action = int(record['action1'])
+        self.agent2.last_action = int(record['action2'])
+        self.agent1.last_reward = round(float(record['reward1']), 2)
+        self.agent2.last_reward = round(float(record['reward2']), 2)
+        self.total_hits1 = int(self.hit_offsets1[log_index] + self.hits1[log_index][local])
+        self.total_hits2 = int(self.hit_offsets2[log_index] + self.hits2[log_index][local])
@@ -3,13 +3,21 @@ import pygame_gui
 import torch
 import os
 import shutil
-from game.game_instance import GameInstance
+from game.game_instance import GameInstance, unmirror_observations
 from ai.agent import Agent
 from ui.main_menu import MainMenu
 from ui.game_ui import GameUI
 from utils.settings import Settings
 from ai.ai_factory import AIFactory
 from game.human_player import HumanPlayer
+from game.match_recorder import MatchRecorder
+from game.replay_instance import ReplayInstance
+from game.instance_manager import InstanceManager
+from ui.dashboard import Dashboard
+from utils import checkpoint
+from utils.metrics import MetricsWriter, MetricsCollector, MetricsServer, Histogram
+from utils.profiler import profiler, PROFILE_DIRECTORY
+import argparse
 import glob
 import time
 
@@ -23,7 +31,6 @@ class PongAISimulation:
         pygame.display.set_caption("Pong AI Simulation")
         self.clock = pygame.time.Clock()
         self.update_font()
-        self.instances = []
         self.current_instance = None
         self.settings = Settings(self.screen_width, self.screen_height)
         self.main_menu = MainMenu(self.screen, self.settings)
@@ -33,29 +40,97 @@ class PongAISimulation:
         self.current_ai_type = 0
         self.training_mode = False
         self.training_speed = 5
-        self.accumulated_events = []
-        self.event_update_interval = 60  # Update console every 60 frames (1 second at 60 FPS)
-        self.frame_count = 0
+        self.accumulated_events = {}  # Game events since the last console update, with their counts
+        self.event_update_interval = 1  # Update console every second
+        self.last_event_update_time = time.time()
+        self.max_console_events = 5  # Distinct events passed to the console per update
         self.autosave_interval = 300  # Autosave every 5 minutes (300 seconds)
         self.last_autosave_time = time.time()
         self.generation = 1  # Add this line to keep track of the current generation
         self.save_directory = "saves"
         os.makedirs(self.save_directory, exist_ok=True)
-        self.self_play_update_frequency = 1000  # Update every 1000 steps
-        self.steps_since_last_update = 0
+        checkpoint.remove_incomplete(self.save_directory)
+        # Old generations are pruned in the background; None disables a rule
+        self.keep_last_generations = 5
+        self.keep_best_generations = 3
+        self.keep_every_generation = 10
+        self.checkpoint_index = checkpoint.CheckpointIndex(self.save_directory)
+        self.checkpoint_writer = checkpoint.CheckpointWriter(
+            self.checkpoint_index,
+            checkpoint.RetentionPolicy(self.keep_last_generations, self.keep_best_generations, self.keep_every_generation),
+            live_segments=self.live_segments
+        )
+        self.replay_warmup_fraction = 0.1  # Share of a resumed replay buffer loaded before learning restarts
         self.human_player = None
+        self.recording_directory = "recordings"
+        self.recording_max_bytes = 64 * 1024 * 1024  # Match logs rotate to a new file past this size
+        self.recorder = None
+        self.replay = None  # ReplayInstance while watching a recorded match
+        # Render policies: draw every frame, draw at capped_render_fps while the simulation
+        # runs flat out, or only draw a stats overlay every turbo_overlay_interval seconds
+        self.render_modes = ["every_frame", "capped", "turbo"]
+        self.render_mode = 0
+        self.capped_render_fps = 15
+        self.turbo_overlay_interval = 1  # seconds
+        self.step_budget = 1 / 60  # seconds of simulation between input checks when not rendering every frame
+        self.last_render_time = 0
+        self.steps_since_render = 0
+        # Human play can be kept as demonstrations that warm-start new DQN agents (H toggles it)
+        self.record_demonstrations = False
+        self.demonstration_directory = os.path.join(self.save_directory, checkpoint.DEMONSTRATION_DIRECTORY)
+        self.demonstration_epochs = 10
+        self.demonstration_epsilon = 0.2  # Exploration left after pretraining, instead of starting fully random
+        # Instances other than the focused one keep training round-robin in the background
+        self.max_instances = 4
+        self.instance_memory_cap = 2 * 1024 ** 3  # bytes of replay data before old instances are evicted
+        self.background_step_budget = 0.004  # seconds per frame spent on background instances
+        self.instance_manager = InstanceManager(self.max_instances, self.instance_memory_cap)
+        self.dashboard = Dashboard(self.screen, self.font)
+        self.show_dashboard = False
+        # Training metrics are written every metrics_interval seconds once start_metrics is called
+        self.metrics_interval = 10
+        self.metrics_writer = None
+        self.metrics_collector = MetricsCollector()
+        self.last_metrics_time = time.time()
+        # Optional Prometheus endpoint, fed a fresh snapshot every metrics_publish_interval seconds
+        self.metrics_server = None
+        self.metrics_publish_interval = 1
+        self.last_publish_time = 0
+        self.last_save_duration = None
+        # F3 shows per-phase timings; F4 records a cProfile of the next profile_capture_seconds
+        self.profile_capture_seconds = 10
+        self.profile_directory = PROFILE_DIRECTORY
+        self.frame_times = Histogram([0.001, 0.002, 0.005, 0.01, 0.0167, 0.033, 0.05, 0.1, 0.25, 1.0])
 
     def update_font(self):
         self.font = pygame.font.Font(None, int(self.screen_height * 0.03))
 
+    def handle_resize(self, width, height):
+        # Layouts are only recomputed here, not every frame
+        self.screen_width, self.screen_height = width, height
+        self.screen = pygame.display.get_surface()
+        self.update_font()
+        self.game_ui.resize(self.screen, self.font)
+        self.main_menu.resize(self.screen)
+        self.dashboard.screen = self.screen
+        self.dashboard.font = self.font
+
     def run(self):
         running = True
         while running:
-            time_delta = self.clock.tick(60) / 1000.0
+            # The frame cap is lifted while the simulation runs faster than it is drawn
+            unthrottled = (self.current_instance and not self.replay and not self.show_dashboard
+                           and not self.paused and self.render_mode != 0)
+            time_delta = self.clock.tick(0 if unthrottled else 60) / 1000.0
+            frame_start = time.perf_counter()
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.VIDEORESIZE:
+                    self.handle_resize(event.w, event.h)
+                elif event.type == pygame.KEYDOWN and self.replay:
+                    self.handle_replay_key(event.key)
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         if self.current_instance:
@@ -68,8 +143,28 @@ class PongAISimulation:
                     elif event.key == pygame.K_t:
                         self.training_mode = not self.training_mode
                         print(f"Training mode: {'ON' if self.training_mode else 'OFF'}")
+                    elif event.key == pygame.K_r and self.current_instance:
+                        self.toggle_recording()
+                    elif event.key == pygame.K_v and self.current_instance:
+                        self.switch_render_mode()
+                    elif event.key == pygame.K_F2:
+                        self.game_ui.show_frame_time = not self.game_ui.show_frame_time
+                    elif event.key == pygame.K_F3:
+                        profiler.toggle()
+                    elif event.key == pygame.K_F4:
+                        self.start_profile_capture()
+                    elif event.key == pygame.K_d and self.current_instance and not self.human_player:
+                        self.show_dashboard = not self.show_dashboard
+                    elif event.key == pygame.K_n and self.show_dashboard:
+                        self.spawn_instance()
+                    elif event.key == pygame.K_h and self.human_player:
+                        self.toggle_demonstrations()
+                elif event.type == pygame.MOUSEBUTTONDOWN and self.show_dashboard and self.current_instance:
+                    instance = self.dashboard.instance_at(event.pos)
+                    if instance:
+                        self.focus_instance(instance)
                 
-                if self.current_instance is None:
+                if self.current_instance is None and self.replay is None:
                     self.main_menu.process_event(event)
                 else:
                     self.game_ui.process_event(event)
@@ -77,15 +172,38 @@ class PongAISimulation:
                 if self.human_player:
                     self.human_player.handle_event(event)
 
-            if self.current_instance:
-                self.run_game(time_delta)
+            # The game screen reports the rects it changed; the menu redraws everything
+            dirty_rects = None
+            if self.replay:
+                dirty_rects = self.run_replay(time_delta)
+            elif self.current_instance and self.show_dashboard:
+                self.run_dashboard()
+            elif self.current_instance:
+                dirty_rects = self.run_game(time_delta)
             else:
                 action = self.run_main_menu(time_delta)
                 if action:
                     self.handle_menu_action(action)
 
-            pygame.display.flip()
+            if dirty_rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty_rects)
+
+            self.frame_times.observe(time.perf_counter() - frame_start)
+            profiler.record('frame', frame_start)
+            report = profiler.poll_capture()
+            if report:
+                self.report_message(f"Profile written: {report}")
+            if self.metrics_server and time.time() - self.last_publish_time >= self.metrics_publish_interval:
+                self.publish_metrics()
 
+        self.leave_current_game()
+        self.checkpoint_writer.wait()
+        if self.metrics_writer:
+            self.metrics_writer.close()
+        if self.metrics_server:
+            self.metrics_server.close()
         pygame.quit()
 
     def run_main_menu(self, time_delta):
@@ -96,6 +214,10 @@ class PongAISimulation:
             self.create_new_instance()
         elif action == "load_game":
             self.load_instance()
+        elif action == "play_vs_ai":
+            self.create_human_vs_ai_instance(2)
+        elif action == "watch_replay":
+            self.start_replay(self.recording_directory)
         elif action == "settings":
             old_settings = self.settings
             self.settings = self.settings.show_settings_menu(self.screen, self.font)
@@ -108,44 +230,140 @@ class PongAISimulation:
             self.settings.apply_settings_to_demo(self.main_menu.demo_game)
 
     def run_game(self, time_delta):
-        if not self.paused:
-            self.current_instance.update()
-        self.frame_count += 1
+        render_mode = self.render_modes[self.render_mode]
+        if render_mode == "every_frame" or self.paused:
+            self.step_game()
+            steps = 1
+        else:
+            # Simulate flat out for one step budget, then return to handle input
+            deadline = time.perf_counter() + self.step_budget
+            steps = 0
+            while time.perf_counter() < deadline:
+                self.step_game()
+                steps += 1
+        self.steps_since_render += steps
+        self.instance_manager.step(self.background_step_budget, exclude=self.current_instance)
 
         # Process accumulated events every second
-        if self.frame_count >= self.event_update_interval:
+        current_time = time.time()
+        if current_time - self.last_event_update_time >= self.event_update_interval:
             if self.accumulated_events:
-                for event in self.accumulated_events:
-                    self.game_ui.add_console_message(event)
+                events = list(self.accumulated_events.items())
+                for event, count in events[:self.max_console_events]:
+                    self.game_ui.add_console_message(event, count)
+                if len(events) > self.max_console_events:
+                    self.game_ui.add_console_message(f"({len(events) - self.max_console_events} other events)")
                 self.accumulated_events.clear()
 
             self.game_ui.add_console_message(f"Total Agent 1 reward: {self.current_instance.total_reward1:.2f}")
             self.game_ui.add_console_message(f"Total Agent 2 reward: {self.current_instance.total_reward2:.2f}")
 
-            self.frame_count = 0
+            self.last_event_update_time = current_time
+
+            for instance in self.instance_manager.evict(keep=self.current_instance):
+                self.game_ui.add_console_message("Evicted the least recently focused instance")
+
+        if self.metrics_writer and current_time - self.last_metrics_time >= self.metrics_interval:
+            row = self.metrics_collector.collect(self.current_instance, self.generation - 1)
+            if row:
+                self.metrics_writer.write(row)
+            self.last_metrics_time = current_time
 
         # Autosave
-        current_time = time.time()
         if current_time - self.last_autosave_time >= self.autosave_interval:
             self.autosave()
             self.last_autosave_time = current_time
+        self.report_finished_saves()
+        self.report_replay_loaded()
+
+        # Nothing is drawn until the render policy says so; an empty list leaves the screen as it is
+        now = time.perf_counter()
+        if not self.paused:
+            if render_mode == "capped" and now - self.last_render_time < 1 / self.capped_render_fps:
+                return []
+            if render_mode == "turbo":
+                # The buttons stay live between overlays, at the frame rate of the step budget
+                self.game_ui.update_controls()
+                self.check_game_ui()
+                if not self.current_instance or now - self.last_render_time < self.turbo_overlay_interval:
+                    return []
+                return self.draw_turbo_overlay(now)
+        self.last_render_time = now
+        self.steps_since_render = 0
+        return self.render_game()
+
+    def step_game(self):
+        if not self.paused:
+            self.current_instance.update()
+        self.collect_events(self.current_instance)
 
-        self.game_ui.draw(self.current_instance, self.paused, self.training_mode)
+    def render_game(self):
+        dirty_rects = self.game_ui.draw(self.current_instance, self.paused, self.training_mode)
+        self.check_game_ui()
+        return dirty_rects
 
-        # Check for UI events
+    def check_game_ui(self):
         action = self.game_ui.check_ui_events()
         if action:
             self.handle_game_ui_action(action)
 
-        self.steps_since_last_update += 1
-        if self.steps_since_last_update >= self.self_play_update_frequency:
-            self.update_opponent_for_self_play()
-            self.steps_since_last_update = 0
+    def draw_turbo_overlay(self, now):
+        instance = self.current_instance
+        steps_per_second = self.steps_since_render / (now - self.last_render_time)
+        lines = [
+            f"Turbo: {steps_per_second:.0f} steps/s (V: render mode)",
+            f"Score: {instance.score1} - {instance.score2}",
+            f"Total reward: {instance.total_reward1:.2f} / {instance.total_reward2:.2f}",
+        ]
+        for name, agent in (("Agent 1", instance.agent1), ("Agent 2", instance.agent2)):
+            if hasattr(agent, 'epsilon'):
+                lines.append(f"{name} epsilon: {agent.epsilon:.3f}")
+
+        self.last_render_time = now
+        self.steps_since_render = 0
+        return self.game_ui.draw_overlay(lines)
+
+    def switch_render_mode(self):
+        self.render_mode = (self.render_mode + 1) % len(self.render_modes)
+        self.game_ui.invalidate()
+        self.last_render_time = 0
+        print(f"Render mode: {self.render_modes[self.render_mode]}")
+
+    def add_instance(self, instance):
+        for evicted in self.instance_manager.add(instance):
+            self.game_ui.add_console_message("Evicted the least recently focused instance")
+
+    def spawn_instance(self):
+        # Another training game next to the current one; unlike New Game, saves are kept
+        agent1, agent2 = self.create_agents()
+        self.instance_manager.focus(self.current_instance)  # So it is not the one evicted
+        self.add_instance(GameInstance(agent1, agent2, self.settings))
+
+    def focus_instance(self, instance):
+        if instance is not self.current_instance:
+            self.stop_recording()
+            self.instance_manager.focus(self.current_instance)
+            self.current_instance = instance
+        self.instance_manager.focus(instance)
+        self.show_dashboard = False
+
+    def run_dashboard(self):
+        # Every instance, the focused one included, shares the frame's step budget
+        self.instance_manager.step(self.step_budget)
+        self.dashboard.draw(self.instance_manager.instances, self.current_instance, self.instance_manager.get_steps())
+        self.report_finished_saves()
+
+    def collect_events(self, instance):
+        # Drain the instance's events every frame so its list never grows
+        for event in instance.events:
+            self.accumulated_events[event] = self.accumulated_events.get(event, 0) + 1
+        instance.events.clear()
 
     def handle_game_ui_action(self, action):
         if action == "save_game":
             self.save_game()
         elif action == "main_menu":
+            self.leave_current_game()
             self.current_instance = None
             self.human_player = None
 
@@ -158,90 +376,336 @@ class PongAISimulation:
             elif self.game_ui.check_button_click(pos, "Save Game"):
                 self.save_game()
             elif self.game_ui.check_button_click(pos, "Main Menu"):
+                self.leave_current_game()
                 self.current_instance = None
                 self.human_player = None
 
     def create_new_instance(self):
+        self.leave_current_game()
         # Delete all existing save files
         self.delete_all_saves()
         
-        agent1 = AIFactory.create_agent(self.ai_types[self.current_ai_type], self.settings)
-        agent2 = AIFactory.create_agent(self.ai_types[self.current_ai_type], self.settings)
+        agent1, agent2 = self.create_agents()
         self.current_instance = GameInstance(agent1, agent2, self.settings)
-        self.instances.append(self.current_instance)
+        self.add_instance(self.current_instance)
         self.generation = 1  # Reset generation counter
         self.game_ui.add_console_message("New game created. All previous saves deleted.")
+        self.pretrain_from_demonstrations()
+
+    def create_agents(self):
+        agent_type = self.ai_types[self.current_ai_type]
+        agent1 = AIFactory.create_agent(agent_type, self.settings)
+        # A shared-replay opponent writes into agent1's buffer, so it gets none of its own
+        learner = agent1 if self.settings.shared_replay and isinstance(agent1, Agent) else None
+        agent2 = AIFactory.create_agent(agent_type, self.settings, learner)
+        return agent1, agent2
+
+    def pretrain_from_demonstrations(self):
+        if not isinstance(self.current_instance.agent1, Agent):
+            return
+        demonstrations = checkpoint.load_demonstrations(self.demonstration_directory)
+        if demonstrations is None:
+            return
+        # Demonstrations are in the left paddle's point of view; an unmirrored agent2 gets them flipped
+        targets = [(self.current_instance.agent1, demonstrations['states'], demonstrations['next_states'])]
+        agent2 = self.current_instance.agent2
+        if isinstance(agent2, Agent) and not self.current_instance.shared_replay:
+            if self.current_instance.mirror_agent2:
+                targets.append((agent2, demonstrations['states'], demonstrations['next_states']))
+            else:
+                targets.append((agent2, unmirror_observations(demonstrations['states']),
+                                unmirror_observations(demonstrations['next_states'])))
+        for agent, states, next_states in targets:
+            accuracy = agent.pretrain(states, demonstrations['actions'], self.demonstration_epochs)
+            agent.epsilon = max(agent.epsilon_min, min(agent.epsilon, self.demonstration_epsilon))
+            # The demonstrations also seed the replay buffer for the RL updates that follow
+            for transition in zip(states, demonstrations['actions'].tolist(),
+                                  demonstrations['rewards'].tolist(), next_states):
+                agent.memory.add(1.0, transition)
+        if self.current_instance.shared_replay:
+            self.current_instance.agent2.policy_net.load_state_dict(self.current_instance.agent1.policy_net.state_dict())
+            self.current_instance.agent2.update_target_network()
+            self.current_instance.agent2.epsilon = self.current_instance.agent1.epsilon
+        self.game_ui.add_console_message(
+            f"Pretrained on {len(demonstrations['actions'])} demonstration steps ({accuracy:.0%} match)")
 
     def load_instance(self):
-        saves = glob.glob(os.path.join(self.save_directory, 'generation_*.pkl'))
-        if saves:
-            latest_save = max(saves, key=os.path.getctime)
-            self.current_instance = GameInstance.load(latest_save)
-            self.instances.append(self.current_instance)
-            self.game_ui.add_console_message(f"Loaded latest save: {os.path.basename(latest_save)}")
-            # Extract generation number from filename
-            self.generation = int(os.path.basename(latest_save).split('_')[1].split('.')[0]) + 1
+        self.leave_current_game()
+        entries = sorted(self.checkpoint_index.get_entries(), key=lambda entry: entry['generation'], reverse=True)
+        legacy_saves = checkpoint.find_legacy_saves(self.save_directory)
+        if entries:
+            # A generation that cannot be read falls back to the one before it
+            for entry in entries:
+                path = self.checkpoint_index.get_path(entry)
+                try:
+                    instance = GameInstance.load(path, background_replay=True,
+                                                 replay_warmup_fraction=self.replay_warmup_fraction)
+                except (ValueError, OSError) as e:
+                    self.game_ui.add_console_message(f"Cannot load {os.path.basename(path)}: {e}")
+                    continue
+                self.current_instance = instance
+                self.add_instance(self.current_instance)
+                self.game_ui.add_console_message(f"Loaded save: {os.path.basename(path)}")
+                # New saves still go after the newest generation, readable or not
+                self.generation = entries[0]['generation'] + 1
+                return
+            print("None of the saved generations could be loaded")
+        elif legacy_saves:
+            # Pickles from older versions are converted into the next generation and kept on disk
+            legacy_save = legacy_saves[-1]
+            self.current_instance = GameInstance.load_legacy(legacy_save)
+            self.add_instance(self.current_instance)
+            self.generation = int(os.path.basename(legacy_save).split('_')[1].split('.')[0]) + 1
+            self.game_ui.add_console_message(f"Converted legacy save: {os.path.basename(legacy_save)}")
+            self.save_game()
         else:
             self.game_ui.add_console_message("No saves found. Starting a new game.")
             self.create_new_instance()
 
     def autosave(self):
         if self.current_instance:
-            filename = f'generation_{self.generation:04d}.pkl'
-            filepath = os.path.join(self.save_directory, filename)
-            self.current_instance.save(filepath)
-            self.game_ui.add_console_message(f"Game autosaved: {filename}")
-            self.generation += 1
+            start = time.perf_counter()
+            filename = self.queue_save()
+            profiler.record('autosave', start)
+            self.game_ui.add_console_message(f"Autosaving: {filename}")
 
     def save_game(self):
         if self.current_instance:
-            filename = f'generation_{self.generation:04d}.pkl'
-            filepath = os.path.join(self.save_directory, filename)
-            self.current_instance.save(filepath)
-            self.game_ui.add_console_message(f"Game manually saved: {filename}")
-            self.generation += 1
+            filename = self.queue_save()
+            self.game_ui.add_console_message(f"Saving: {filename}")
+
+    def queue_save(self):
+        # Snapshot now, write on the checkpoint thread so the game keeps running
+        filename = f'generation_{self.generation:04d}'
+        filepath = os.path.join(self.save_directory, filename)
+        self.checkpoint_writer.submit(self.current_instance.snapshot(self.generation), filepath)
+        self.generation += 1
+        return filename
+
+    def report_finished_saves(self):
+        for filepath, duration, error in self.checkpoint_writer.poll():
+            if error:
+                self.game_ui.add_console_message(f"Save failed: {os.path.basename(filepath)} ({error})")
+            else:
+                self.last_save_duration = duration
+                self.game_ui.add_console_message(f"Game saved: {os.path.basename(filepath)} in {duration:.1f}s")
 
     def delete_all_saves(self):
-        for file in glob.glob(os.path.join(self.save_directory, 'generation_*.pkl')):
-            os.remove(file)
+        self.checkpoint_writer.wait()
+        legacy_saves = checkpoint.find_legacy_saves(self.save_directory)
+        for path in glob.glob(os.path.join(self.save_directory, 'generation_*')):
+            if path in legacy_saves:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        shutil.rmtree(os.path.join(self.save_directory, checkpoint.REPLAY_DIRECTORY), ignore_errors=True)
+        self.checkpoint_index.clear()
+
+        # Games still running lose the segments their buffers were saved in
+        for instance in list(self.instance_manager.instances):
+            if instance.replay_loader and not instance.replay_loader.finished.is_set():
+                # Its replay was still streaming in from the deleted files
+                self.instance_manager.remove(instance)
+                self.game_ui.add_console_message("Closed a game whose replay was still loading")
+                continue
+            for agent in (instance.agent1, instance.agent2):
+                if isinstance(agent, Agent):
+                    agent.memory.forget_saved()
         self.game_ui.add_console_message("All save files deleted.")
+        if legacy_saves:
+            self.game_ui.add_console_message(f"Kept {len(legacy_saves)} legacy .pkl saves; remove them by hand")
 
-    def update_opponent_for_self_play(self):
-        if isinstance(self.current_instance.agent2, Agent):
-            self.current_instance.agent2.policy_net.load_state_dict(self.current_instance.agent1.policy_net.state_dict())
-            self.game_ui.add_console_message("Updated opponent for self-play")
+    def live_segments(self):
+        # Called from the checkpoint thread; buffers replace their segment list rather than changing it
+        segments = set()
+        for instance in list(self.instance_manager.instances):
+            for agent in (instance.agent1, instance.agent2):
+                if isinstance(agent, Agent):
+                    segments.update(agent.memory.segments)
+        return segments
 
     def create_human_vs_ai_instance(self, agent_number):
+        self.leave_current_game()
         # Load the latest saved model
         latest_save = self.get_latest_save()
         if latest_save:
-            loaded_instance = GameInstance.load(latest_save)
-            if agent_number == 1:
-                ai_agent = loaded_instance.agent1
-            else:
-                ai_agent = loaded_instance.agent2
+            # Only the policy weights are needed to play, not optimizers or replay buffers
+            ai_agent = checkpoint.load_policy(latest_save, f'agent{agent_number}', self.settings)
             self.game_ui.add_console_message(f"Loaded AI model from: {os.path.basename(latest_save)}")
         else:
             # If no save exists, create a new AI agent
             ai_agent = AIFactory.create_agent(self.ai_types[self.current_ai_type], self.settings)
             self.game_ui.add_console_message("No saved model found. Created a new AI agent.")
 
-        self.human_player = HumanPlayer(self.settings)
+        self.human_player = HumanPlayer(self.settings, record_demonstrations=self.record_demonstrations)
         
         if agent_number == 1:
             self.current_instance = GameInstance(ai_agent, self.human_player, self.settings)
         else:
             self.current_instance = GameInstance(self.human_player, ai_agent, self.settings)
         
-        self.instances.append(self.current_instance)
+        self.add_instance(self.current_instance)
         self.game_ui.add_console_message(f"New game created: Human vs AI (Agent {agent_number})")
 
+    def report_replay_loaded(self):
+        loader = self.current_instance.replay_loader
+        if loader and loader.finished.is_set():
+            if loader.error:
+                self.game_ui.add_console_message(f"Replay load failed: {loader.error}")
+            else:
+                self.game_ui.add_console_message("Replay buffer fully loaded")
+            self.current_instance.replay_loader = None
+
+    def toggle_recording(self):
+        if self.recorder:
+            self.stop_recording()
+        else:
+            self.recorder = MatchRecorder(self.recording_directory, self.current_instance.settings,
+                                          self.recording_max_bytes)
+            self.current_instance.recorder = self.recorder
+            self.game_ui.add_console_message(f"Recording match to {self.recording_directory}/")
+
+    def leave_current_game(self):
+        self.stop_recording()
+        self.save_demonstrations()
+        self.show_dashboard = False
+        # Leaving a game ends it; only games spawned from the dashboard keep running beside it
+        if self.current_instance:
+            self.instance_manager.remove(self.current_instance)
+
+    def toggle_demonstrations(self):
+        self.record_demonstrations = not self.record_demonstrations
+        if self.record_demonstrations:
+            self.human_player.start_demonstrations()
+            self.game_ui.add_console_message("Recording your moves as demonstrations")
+        else:
+            self.save_demonstrations()
+            self.game_ui.add_console_message("Demonstration recording off")
+
+    def save_demonstrations(self):
+        if self.human_player and self.human_player.demonstrations is not None and len(self.human_player.demonstrations) > 0:
+            path = checkpoint.save_demonstrations(self.human_player.demonstrations, self.demonstration_directory)
+            self.game_ui.add_console_message(f"Saved {len(self.human_player.demonstrations)} demonstration steps to {path}")
+        if self.human_player:
+            self.human_player.demonstrations = None
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.game_ui.add_console_message(f"Recording stopped after {self.recorder.tick} ticks")
+            if self.current_instance:
+                self.current_instance.recorder = None
+            self.recorder = None
+
+    def start_profile_capture(self):
+        if profiler.start_capture(self.profile_capture_seconds, self.profile_directory):
+            self.report_message(f"Profiling the next {self.profile_capture_seconds}s")
+        else:
+            self.report_message("A profile is already being captured")
+
+    def report_message(self, message):
+        # The console is only drawn on the game screen
+        if self.current_instance:
+            self.game_ui.add_console_message(message)
+        else:
+            print(message)
+
+    def start_metrics(self, path):
+        self.metrics_writer = MetricsWriter(path)
+        print(f"Writing training metrics to {path}")
+
+    def start_metrics_server(self, port):
+        try:
+            self.metrics_server = MetricsServer(port)
+        except OSError as e:
+            print(f"Cannot start metrics endpoint on port {port}: {e}")
+            return
+        print(f"Serving metrics at http://127.0.0.1:{port}/metrics")
+
+    def publish_metrics(self):
+        # Built on the game thread and handed over whole; the server never reads live objects
+        families = [
+            ("pong_ticks_total", "counter", "Game updates across all instances", [({}, self.instance_manager.total_steps())]),
+            ("pong_instances", "gauge", "Running game instances", [({}, len(self.instance_manager.instances))]),
+            ("pong_replay_bytes", "gauge", "Estimated replay buffer memory", [({}, self.instance_manager.memory_usage())]),
+            ("pong_checkpoint_generation", "gauge", "Last generation queued for saving", [({}, self.generation - 1)]),
+        ]
+        if self.last_save_duration is not None:
+            families.append(("pong_last_save_duration_seconds", "gauge", "Time the last checkpoint took to write", [({}, self.last_save_duration)]))
+        instance = self.current_instance
+        if instance:
+            agents = [(str(number), agent) for number, agent in ((1, instance.agent1), (2, instance.agent2)) if isinstance(agent, Agent)]
+            families += [
+                ("pong_train_steps_total", "counter", "Learning steps of the focused instance's agents", [({'agent': name}, agent.total_train_steps) for name, agent in agents]),
+                ("pong_epsilon", "gauge", "Exploration rate of the focused instance's agents", [({'agent': name}, agent.epsilon) for name, agent in agents]),
+                ("pong_score", "gauge", "Score in the focused instance", [({'agent': '1'}, instance.score1), ({'agent': '2'}, instance.score2)]),
+            ]
+        families.append(("pong_frame_seconds", "histogram", "Main loop work per frame", self.frame_times.snapshot()))
+        self.metrics_server.publish(families)
+        self.last_publish_time = time.time()
+
+    def start_replay(self, path):
+        try:
+            self.replay = ReplayInstance.from_path(path)
+        except (OSError, ValueError) as e:
+            print(f"Cannot open replay: {e}")
+            return
+        self.game_ui.add_console_message(f"Watching replay: {os.path.basename(os.path.normpath(path))}")
+        self.game_ui.add_console_message("Space: pause")
+        self.game_ui.add_console_message("Left/Right: seek 5s")
+        self.game_ui.add_console_message("Up/Down: speed")
+        self.game_ui.add_console_message("PgUp/PgDn: points")
+
+    def run_replay(self, time_delta):
+        self.replay.update(time_delta)
+        dirty_rects = self.game_ui.draw(self.replay, self.replay.paused, False, self.replay.get_status())
+
+        if self.game_ui.check_ui_events() == "main_menu":
+            self.replay = None
+        return dirty_rects
+
+    def handle_replay_key(self, key):
+        if key == pygame.K_ESCAPE:
+            self.replay = None
+        elif key == pygame.K_SPACE:
+            self.replay.paused = not self.replay.paused
+        elif key == pygame.K_LEFT:
+            self.replay.seek_seconds(-5)
+        elif key == pygame.K_RIGHT:
+            self.replay.seek_seconds(5)
+        elif key == pygame.K_UP:
+            self.replay.change_speed(2)
+        elif key == pygame.K_DOWN:
+            self.replay.change_speed(0.5)
+        elif key == pygame.K_PAGEUP:
+            self.replay.previous_keyframe()
+        elif key == pygame.K_PAGEDOWN:
+            self.replay.next_keyframe()
+        elif key == pygame.K_HOME:
+            self.replay.seek(0)
+        elif key == pygame.K_END:
+            self.replay.seek(self.replay.length - 1)
+
     def get_latest_save(self):
-        saves = glob.glob(os.path.join(self.save_directory, 'generation_*.pkl'))
-        if saves:
-            return max(saves, key=os.path.getctime)
+        entry = self.checkpoint_index.latest()
+        if entry:
+            return self.checkpoint_index.get_path(entry)
         return None
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pong AI Simulation")
+    parser.add_argument('--replay', metavar='PATH', help="watch a recorded match (a match log or a recordings directory)")
+    parser.add_argument('--metrics', metavar='PATH', help="write training metrics to a .jsonl or .csv file")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT', help="serve Prometheus metrics on this local port")
+    args = parser.parse_args()
+
     simulation = PongAISimulation()
+    if args.metrics:
+        simulation.start_metrics(args.metrics)
+    if args.metrics_port:
+        simulation.start_metrics_server(args.metrics_port)
+    if args.replay:
+        simulation.start_replay(args.replay)
     simulation.run()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+# Headless pygame, and the repo root importable wherever pytest is started from
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pytest
+from ai.agent import Agent
+from game.game_instance import GameInstance
+from utils.settings import Settings
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    # Settings reads data/settings.json relative to the working directory
+    monkeypatch.chdir(ROOT)
+    settings = Settings(640, 480)
+    settings.shared_replay = False
+    settings.action_repeat = 1
+    return settings
+
+
+def new_game(settings, ticks=0):
+    game = GameInstance(Agent(settings), Agent(settings), settings)
+    run(game, ticks)
+    return game
+
+
+def run(game, ticks):
+    for _ in range(ticks):
+        game.update()
+    game.events.clear()
+
+
+def assert_same_replay(memory, expected):
+    assert len(memory) == len(expected)
+    assert memory.position == expected.position
+    np.testing.assert_array_equal(memory.priorities[:len(memory)], expected.priorities[:len(expected)])
+    # Segments store states as float32
+    for row, expected_row in zip(memory.buffer, expected.buffer):
+        np.testing.assert_allclose(row[0], expected_row[0], rtol=1e-6, atol=1e-7)
+        assert row[1] == expected_row[1]
+        assert row[2] == pytest.approx(expected_row[2])
+        np.testing.assert_allclose(row[3], expected_row[3], rtol=1e-6, atol=1e-7)
+
+
+def assert_same_weights(net, expected):
+    for name, tensor in expected.state_dict().items():
+        assert (net.state_dict()[name].cpu() == tensor.cpu()).all(), name
@@ -0,0 +1,203 @@
+import json
+import os
+import pickle
+import pytest
+from ai.agent import Agent
+from game.game_instance import GameInstance
+from utils import checkpoint
+from conftest import new_game, run, assert_same_replay, assert_same_weights
+
+
+def save(game, save_directory, generation):
+    directory = os.path.join(save_directory, f'generation_{generation:04d}')
+    game.save(directory, generation)
+    return directory
+
+
+def segment_files(save_directory, agent='agent1'):
+    replay_directory = os.path.join(save_directory, checkpoint.REPLAY_DIRECTORY, agent)
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(replay_directory))
+
+
+def test_snapshot_round_trip(settings, tmp_path):
+    game = new_game(settings, 150)
+    directory = save(game, str(tmp_path), 1)
+
+    loaded = GameInstance.load(directory)
+    assert (loaded.score1, loaded.score2) == (game.score1, game.score2)
+    for agent, expected in ((loaded.agent1, game.agent1), (loaded.agent2, game.agent2)):
+        assert agent.epsilon == expected.epsilon
+        assert_same_weights(agent.policy_net, expected.policy_net)
+        assert_same_weights(agent.target_net, expected.target_net)
+        assert_same_replay(agent.memory, expected.memory)
+
+
+def test_incremental_snapshots_rebuild_the_whole_buffer(settings, tmp_path):
+    game = new_game(settings, 80)
+    first = save(game, str(tmp_path), 1)
+    run(game, 80)
+    second = save(game, str(tmp_path), 2)
+
+    first_segments = checkpoint.read_manifest(first)['agents']['agent1']['replay']['segments']
+    second_segments = checkpoint.read_manifest(second)['agents']['agent1']['replay']['segments']
+    assert len(first_segments) == 1
+    assert second_segments[:1] == first_segments and len(second_segments) == 2
+    assert_same_replay(GameInstance.load(second).agent1.memory, game.agent1.memory)
+
+
+def test_shared_replay_round_trip(settings, tmp_path):
+    settings.shared_replay = True
+    game = new_game(settings, 100)
+    loaded = GameInstance.load(save(game, str(tmp_path), 1))
+
+    assert loaded.shared_replay
+    assert loaded.agent2.memory is loaded.agent1.memory
+    assert loaded.agent2.learner is loaded.agent1
+    assert_same_replay(loaded.agent1.memory, game.agent1.memory)
+
+
+def test_load_rejects_newer_format(settings, tmp_path):
+    directory = save(new_game(settings, 10), str(tmp_path), 1)
+    manifest_path = os.path.join(directory, checkpoint.MANIFEST_NAME)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['format_version'] = checkpoint.FORMAT_VERSION + 1
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError):
+        GameInstance.load(directory)
+
+
+def test_load_reports_missing_segments(settings, tmp_path):
+    directory = save(new_game(settings, 10), str(tmp_path), 1)
+    segment = segment_files(str(tmp_path))[0]
+    os.remove(os.path.join(str(tmp_path), checkpoint.REPLAY_DIRECTORY, 'agent1', f'{segment}.npz'))
+
+    with pytest.raises(FileNotFoundError):
+        GameInstance.load(directory)
+    # Networks alone still load
+    GameInstance.load(directory, load_replay=False)
+
+
+def test_failed_write_voids_snapshots_queued_after_it(settings, tmp_path, monkeypatch):
+    game = new_game(settings, 50)
+    failed = game.snapshot(1)
+    run(game, 50)
+    queued = game.snapshot(2)  # Lists the segment of the snapshot that is about to fail
+
+    def disk_full(*args):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(checkpoint, '_write_agent', disk_full)
+        with pytest.raises(OSError):
+            checkpoint.write_snapshot(failed, os.path.join(str(tmp_path), 'generation_0001'))
+    checkpoint.discard_snapshot(failed)
+
+    with pytest.raises(RuntimeError):
+        checkpoint.write_snapshot(queued, os.path.join(str(tmp_path), 'generation_0002'))
+    checkpoint.discard_snapshot(queued)
+
+    # Both rolled back, so the next save writes every row again
+    directory = save(game, str(tmp_path), 3)
+    assert_same_replay(GameInstance.load(directory).agent1.memory, game.agent1.memory)
+
+
+def test_failed_background_load_keeps_loaded_rows(settings, tmp_path):
+    game = new_game(settings, 60)
+    save(game, str(tmp_path), 1)
+    saved_rows = len(game.agent1.memory)
+    run(game, 60)
+    directory = save(game, str(tmp_path), 2)
+    manifest = checkpoint.read_manifest(directory)
+    replay_info = manifest['agents']['agent1']['replay']
+    os.remove(os.path.join(str(tmp_path), checkpoint.REPLAY_DIRECTORY, 'agent1', f"{replay_info['segments'][1]}.npz"))
+
+    memory = Agent(settings).memory
+    loader = checkpoint.ReplayLoader([(memory, os.path.join(checkpoint.get_replay_root(directory), 'agent1'), replay_info)], 0.1)
+    loader.finished.wait()
+
+    assert isinstance(loader.error, FileNotFoundError)
+    assert len(memory) == saved_rows and None not in memory.buffer
+    assert memory.segments == [] and memory.is_warm()
+    assert memory.snapshot()['count'] == saved_rows  # Written again by the next save
+
+
+def test_legacy_conversion(settings, tmp_path):
+    game = new_game(settings, 100)
+    path = os.path.join(str(tmp_path), 'generation_7.pkl')
+    # Legacy saves pickled the agents whole; the buffer's lock cannot be pickled
+    for agent in (game.agent1, game.agent2):
+        del agent.memory.lock
+    with open(path, 'wb') as f:
+        pickle.dump({'agent1': game.agent1, 'agent2': game.agent2, 'settings': settings,
+                     'score1': 3, 'score2': 4, 'total_reward1': 1.5, 'total_reward2': -1.5}, f)
+
+    assert checkpoint.find_legacy_saves(str(tmp_path)) == [path]
+    converted = GameInstance.load_legacy(path)
+    assert (converted.score1, converted.score2, converted.total_reward1) == (3, 4, 1.5)
+    assert_same_weights(converted.agent1.policy_net, game.agent1.policy_net)
+    assert_same_replay(converted.agent1.memory, game.agent1.memory)
+
+    # Converted games save every row in the current format
+    loaded = GameInstance.load(save(converted, str(tmp_path), 8))
+    assert_same_replay(loaded.agent2.memory, game.agent2.memory)
+    assert os.path.exists(path)
+
+
+def test_index_tracks_latest_generation(settings, tmp_path):
+    index = checkpoint.CheckpointIndex(str(tmp_path))
+    game = new_game(settings)
+    for generation in (1, 3, 2):
+        directory = save(game, str(tmp_path), generation)
+        index.add(directory, checkpoint.read_manifest(directory))
+
+    assert index.latest()['generation'] == 3
+    index.remove(3)
+    assert index.latest()['generation'] == 2
+    # Re-read from index.jsonl, deletions included
+    assert checkpoint.CheckpointIndex(str(tmp_path)).latest()['generation'] == 2
+    index.clear()
+    assert index.latest() is None
+
+
+def test_retention_removes_unreferenced_segments(settings, tmp_path):
+    save_directory = str(tmp_path)
+    index = checkpoint.CheckpointIndex(save_directory)
+    writer = checkpoint.CheckpointWriter(index, checkpoint.RetentionPolicy(keep_last=1))
+    game = new_game(settings, 50)
+
+    writer.submit(game.snapshot(1), os.path.join(save_directory, 'generation_0001'))
+    writer.wait()
+    old_segments = segment_files(save_directory)
+    # After the saves are forgotten, the next one writes a fresh full segment
+    for agent in (game.agent1, game.agent2):
+        agent.memory.forget_saved()
+    run(game, 20)
+    writer.submit(game.snapshot(2), os.path.join(save_directory, 'generation_0002'))
+    writer.wait()
+
+    assert [error for _, _, error in writer.poll()] == [None, None]
+    assert [entry['generation'] for entry in index.get_entries()] == [2]
+    assert not os.path.exists(os.path.join(save_directory, 'generation_0001'))
+    assert set(old_segments).isdisjoint(segment_files(save_directory))
+    assert_same_replay(GameInstance.load(index.get_path(index.latest())).agent1.memory, game.agent1.memory)
+
+
+def test_retention_keeps_segments_of_live_buffers(settings, tmp_path):
+    save_directory = str(tmp_path)
+    index = checkpoint.CheckpointIndex(save_directory)
+    game = new_game(settings, 50)
+    other = new_game(settings, 30)
+    # other is still running on segments no surviving manifest lists
+    writer = checkpoint.CheckpointWriter(index, checkpoint.RetentionPolicy(keep_last=1),
+                                         live_segments=lambda: set(other.agent1.memory.segments))
+
+    writer.submit(other.snapshot(1), os.path.join(save_directory, 'generation_0001'))
+    writer.submit(game.snapshot(2), os.path.join(save_directory, 'generation_0002'))
+    writer.wait()
+
+    assert [entry['generation'] for entry in index.get_entries()] == [2]
+    assert set(other.agent1.memory.segments) <= set(segment_files(save_directory))
+    assert set(other.agent2.memory.segments).isdisjoint(segment_files(save_directory, 'agent2'))
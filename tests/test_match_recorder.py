@@ -0,0 +1,54 @@
+import numpy as np
+from game.match_recorder import MatchRecorder, MatchLog, RECORD_DTYPE, HEADER_SIZE, load_match_logs
+from conftest import new_game
+
+
+def record(game, recorder, ticks):
+    states = []
+    game.recorder = recorder
+    for _ in range(ticks):
+        game.update()
+        states.append((game.ball.x, game.ball.y, game.paddle1.y, game.paddle2.y, game.score1, game.score2))
+    recorder.close()
+    return states
+
+
+def test_match_log_round_trip(settings, tmp_path):
+    game = new_game(settings)
+    states = record(game, MatchRecorder(str(tmp_path), settings, chunk_records=64), 300)
+
+    logs = load_match_logs(str(tmp_path))
+    assert len(logs) == 1
+    log = logs[0]
+    assert (log.width, log.height) == (settings.width, settings.height)
+    assert log.paddle2_x == game.paddle2.x
+    assert len(log) == 300
+    np.testing.assert_array_equal(log['tick'], np.arange(300))
+    ball_x, ball_y, paddle1_y, paddle2_y, score1, score2 = map(np.array, zip(*states))
+    np.testing.assert_allclose(log['ball_x'], ball_x, rtol=1e-6)
+    np.testing.assert_allclose(log['ball_y'], ball_y, rtol=1e-6)
+    np.testing.assert_allclose(log['paddle1_y'], paddle1_y, rtol=1e-6)
+    np.testing.assert_allclose(log['paddle2_y'], paddle2_y, rtol=1e-6)
+    np.testing.assert_array_equal(log['score1'], score1)
+    np.testing.assert_array_equal(log['score2'], score2)
+    assert set(np.unique(log['action1'])) <= {0, 1, 2}
+
+
+def test_match_logs_rotate(settings, tmp_path):
+    game = new_game(settings)
+    max_bytes = HEADER_SIZE + 100 * RECORD_DTYPE.itemsize
+    record(game, MatchRecorder(str(tmp_path), settings, max_bytes=max_bytes, chunk_records=50), 350)
+
+    logs = load_match_logs(str(tmp_path))
+    assert [len(log) for log in logs] == [100, 100, 100, 50]
+    np.testing.assert_array_equal(np.concatenate([log['tick'] for log in logs]), np.arange(350))
+
+
+def test_partial_record_is_ignored(settings, tmp_path):
+    game = new_game(settings)
+    record(game, MatchRecorder(str(tmp_path), settings), 20)
+    path = load_match_logs(str(tmp_path))[0].path
+    with open(path, 'ab') as f:
+        f.write(b'\0' * (RECORD_DTYPE.itemsize // 2))  # A crash mid-write
+
+    assert len(MatchLog(path)) == 20
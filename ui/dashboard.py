@@ -0,0 +1,48 @@
+import math
+import pygame
+
+class Dashboard:
+    """Grid of low-resolution thumbnails, one per running instance"""
+
+    def __init__(self, screen, font):
+        self.screen = screen
+        self.font = font
+        self.cells = []  # (rect, instance) from the last draw, for clicks
+
+    def draw(self, instances, current_instance, steps):
+        self.screen.fill((20, 20, 30))
+        self.cells = []
+        if not instances:
+            return
+
+        columns = math.ceil(math.sqrt(len(instances)))
+        rows = math.ceil(len(instances) / columns)
+        margin = int(self.screen.get_height() * 0.05)
+        cell_width = (self.screen.get_width() - margin) // columns
+        cell_height = (self.screen.get_height() - margin) // rows
+
+        for i, instance in enumerate(instances):
+            cell = pygame.Rect(margin + (i % columns) * cell_width, margin + (i // columns) * cell_height,
+                               cell_width - margin, cell_height - margin)
+            self.draw_thumbnail(cell, instance.thumbnail(), instance is current_instance)
+            label = f"#{i + 1}  {instance.score1} - {instance.score2}  {steps.get(instance, 0)} steps"
+            self.screen.blit(self.font.render(label, True, (200, 200, 200)), (cell.x, cell.bottom + 2))
+            self.cells.append((cell, instance))
+
+    def draw_thumbnail(self, cell, state, focused):
+        ball_x, ball_y, paddle1_y, paddle2_y, paddle_height = state
+        pygame.draw.rect(self.screen, (50, 50, 50), cell)
+        pygame.draw.rect(self.screen, (255, 255, 0) if focused else (100, 100, 100), cell, 2)
+
+        paddle_width = max(2, cell.width // 50)
+        height = max(2, int(paddle_height * cell.height))
+        pygame.draw.rect(self.screen, (255, 255, 255), (cell.x + paddle_width, cell.y + int(paddle1_y * cell.height), paddle_width, height))
+        pygame.draw.rect(self.screen, (255, 255, 255), (cell.right - 2 * paddle_width, cell.y + int(paddle2_y * cell.height), paddle_width, height))
+        size = max(2, cell.width // 80)
+        pygame.draw.rect(self.screen, (255, 255, 255), (cell.x + int(ball_x * cell.width), cell.y + int(ball_y * cell.height), size, size))
+
+    def instance_at(self, pos):
+        for cell, instance in self.cells:
+            if cell.collidepoint(pos):
+                return instance
+        return None
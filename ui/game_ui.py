@@ -1,19 +1,38 @@
 import pygame
 import pygame_gui
 from ui.network_visualizer import NetworkVisualizer
-from ai.agent import Agent
+from ui.text_cache import TextCache
+from utils.profiler import profiler
 from collections import deque
+import numpy as np
 import os
+import time
 
 class GameUI:
     def __init__(self, screen, font, settings):
         self.screen = screen
         self.font = font
         self.settings = settings
-        self.console_messages = []
-        self.max_messages = 5
+        self.max_messages = 10
         self.message_lifetime = 5  # seconds
-        self.message_fade_time = 1  # seconds
+        self.message_fade_time = 1  # seconds, at the end of the lifetime
+        self.message_fade_steps = 8  # Faded colors are quantized so their surfaces stay cached
+        self.console_messages = deque(maxlen=self.max_messages)  # [message, count, time of last occurrence]
+        self.text_cache = TextCache()
+        # Static layer and what was drawn over it last frame, for dirty-rectangle updates
+        self.background = None
+        self.previous_items = {}
+        self.last_instance = None
+        # Ball trail ring buffer and sprite strip, and blurred glow sprites per (size, intensity)
+        self.max_trail_length = 20
+        self.trail_positions = np.zeros((self.max_trail_length, 2), dtype=int)
+        self.trail_head = 0
+        self.trail_count = 0
+        self.trail_strip = None
+        self.trail_strip_key = (None, None)
+        self.glow_sprites = {}
+        self.show_frame_time = False
+        self.draw_time = 0.0  # Smoothed GameUI.draw duration in seconds
         
         # Initialize network visualization flags
         self.show_network_agent1 = False
@@ -33,10 +52,49 @@ class GameUI:
         self.create_ui_elements()
 
     def update_layout(self):
-        self.left_sidebar_width = int(self.screen.get_width() * 0.2)
-        self.right_sidebar_width = int(self.screen.get_width() * 0.2)
-        self.game_area_width = self.screen.get_width() - self.left_sidebar_width - self.right_sidebar_width
-        self.game_area_height = self.screen.get_height()
+        """Compute every position from the window size; only runs on creation and resize"""
+        width, height = self.screen.get_size()
+        # Same size as the font main.py passes in, so cached text matches it
+        self.font_size = int(height * 0.03)
+        self.left_sidebar_width = int(width * 0.2)
+        self.right_sidebar_width = int(width * 0.2)
+        self.game_area_width = width - self.left_sidebar_width - self.right_sidebar_width
+        self.game_area_height = height
+        self.game_area = pygame.Rect(self.left_sidebar_width, 0, self.game_area_width, self.game_area_height)
+        self.layout = {
+            'score1': (int(width * 0.4), int(height * 0.05)),
+            'score2': (int(width * 0.6), int(height * 0.05)),
+            'agent1_data': (int(width * 0.01), int(height * 0.05)),
+            'agent2_data': (int(width * 0.01), int(height * 0.5)),
+            'data_offset': int(height * 0.05),
+            'data_line_height': int(height * 0.04),
+            'console': (width - self.right_sidebar_width + 10, 50),
+            'console_line_height': int(height * 0.03),
+            'paused': (width // 2, height // 2),
+            'training': (width // 2, int(height * 0.05)),
+            'confidence1': (int(width * 0.25), int(height * 0.95)),
+            'confidence2': (int(width * 0.55), int(height * 0.95)),
+            'confidence_bar': (int(width * 0.2), int(height * 0.02)),
+            'performance_bar': pygame.Rect((width - int(width * 0.4)) // 2, int(height * 0.02), int(width * 0.4), int(height * 0.03)),
+            'difficulty': (int(width * 0.8), int(height * 0.05)),
+            'frame_time': (int(width * 0.8), int(height * 0.08)),
+            'profiler': (self.left_sidebar_width + 10, int(height * 0.1)),
+            'status': (self.left_sidebar_width + 10, int(height * 0.85)),
+        }
+
+    def resize(self, screen, font):
+        # The window changed size: rebuild the layout, the buttons and everything cached for the old size
+        self.screen = screen
+        self.font = font
+        self.network_visualizer.screen = screen
+        self.network_visualizer.font = font
+        self.manager.set_window_resolution(screen.get_size())
+        self.manager.clear_and_reset()
+        self.update_layout()
+        self.create_ui_elements()
+        self.text_cache.clear()
+        self.glow_sprites.clear()
+        self.background = None
 
     def create_ui_elements(self):
         # Calculate button dimensions based on screen size
@@ -90,107 +148,270 @@ class GameUI:
             object_id="#game_button"
         )
 
-    def draw(self, game_instance, paused, training_mode):
-        self.update_layout()
-        self.screen.fill((0, 0, 0))
+    def draw(self, game_instance, paused, training_mode, status=None):
+        """Redraw what changed since the last frame and return the screen rects to update"""
+        start_time = time.perf_counter()
+        self.manager.update(pygame.time.get_ticks() / 1000.0)
+        items = self.build_items(game_instance, paused, training_mode, status)
+
+        if self.background is None or game_instance is not self.last_instance:
+            self.build_background()
+            self.last_instance = game_instance
+            dirty = [self.screen.get_rect()]
+        else:
+            dirty = self.find_dirty_rects(items)
+
+        # Erase to the static layer, then draw every item touching an erased area in order
+        for rect in dirty:
+            self.screen.blit(self.background, rect, rect)
+        for name, key, rect, draw in items:
+            if rect.collidelist(dirty) != -1:
+                draw()
+
+        self.previous_items = {name: (key, rect) for name, key, rect, draw in items}
+        self.draw_time += (time.perf_counter() - start_time - self.draw_time) * 0.1
+        profiler.record('ui_draw', start_time)
+        return dirty
+
+    def invalidate(self):
+        # Something else drew over the screen; redraw everything next frame
+        self.background = None
+
+    def update_controls(self):
+        # Lets button presses through on frames that skip draw()
+        self.manager.update(pygame.time.get_ticks() / 1000.0)
 
-        # Draw game area
-        game_area = pygame.Rect(self.left_sidebar_width, 0, self.game_area_width, self.game_area_height)
-        pygame.draw.rect(self.screen, (50, 50, 50), game_area)
+    def draw_overlay(self, lines):
+        """Turbo mode's screen: stats text and the buttons instead of the game"""
+        self.screen.fill((0, 0, 0))
+        line_height = int(self.screen.get_height() * 0.04)
+        for i, line in enumerate(lines):
+            self.screen.blit(self.render_text(line, (200, 200, 200)), (20, 20 + i * line_height))
+        self.manager.draw_ui(self.screen)
+        # The overlay replaced the game screen, so the next draw() starts from scratch
+        self.invalidate()
+        return [self.screen.get_rect()]
+
+    def build_background(self):
+        # Everything that only changes with the window size
+        self.background = pygame.Surface(self.screen.get_size())
+        self.background.fill((0, 0, 0))
+        pygame.draw.rect(self.background, (50, 50, 50), self.game_area)
+        pygame.draw.rect(self.background, (30, 30, 30), (0, 0, self.left_sidebar_width, self.screen.get_height()))
+        pygame.draw.rect(self.background, (30, 30, 30), (self.screen.get_width() - self.right_sidebar_width, 0, self.right_sidebar_width, self.screen.get_height()))
+
+        self.background.blit(self.render_text("Console Output", (255, 255, 255)), (self.screen.get_width() - self.right_sidebar_width + 10, 10))
+        self.background.blit(self.render_text("Agent 1", (255, 255, 255)), self.layout['agent1_data'])
+        self.background.blit(self.render_text("Agent 2", (255, 255, 255)), self.layout['agent2_data'])
+
+    def find_dirty_rects(self, items):
+        # Items whose content or position changed, plus where they were last frame
+        dirty = []
+        redrawn = set()
+        for name, key, rect, draw in items:
+            previous = self.previous_items.get(name)
+            if previous is None or previous != (key, rect):
+                redrawn.add(name)
+                dirty.append(rect)
+                if previous:
+                    dirty.append(previous[1])
+        current = {item[0] for item in items}
+        for name, (key, rect) in self.previous_items.items():
+            if name not in current:
+                dirty.append(rect)
+
+        # Items overlapping a dirty area are redrawn whole, so their rects are erased too, until nothing new overlaps
+        growing = True
+        while growing:
+            growing = False
+            for name, key, rect, draw in items:
+                if name not in redrawn and rect.collidelist(dirty) != -1:
+                    redrawn.add(name)
+                    dirty.append(rect)
+                    growing = True
+        return dirty
+
+    def build_items(self, game_instance, paused, training_mode, status):
+        """Everything drawn over the background this frame, as (name, key, rect, draw) in drawing order.
+
+        An item is redrawn when its key or rect changes, or when it overlaps an area that is.
+        """
+        items = []
+        game_area = self.game_area
 
         # Calculate scale factors
         scale_x = self.game_area_width / game_instance.settings.width
         scale_y = self.game_area_height / game_instance.settings.height
 
-        # Draw paddles
-        paddle1_rect = pygame.Rect(
-            self.left_sidebar_width + int(game_instance.paddle1.x * scale_x),
-            int(game_instance.paddle1.y * scale_y),
-            int(game_instance.paddle1.width * scale_x),
-            int(game_instance.paddle1.height * scale_y)
-        )
-        # black paddle1 labbel that fits inside the pattle perfectly vertically
-        # the label will scale with the paddle and the text will be centered inside the padel
-        paddle1_label = self.font.render("Paddle 1", True, (0, 0, 0))
-        self.screen.blit(paddle1_label, (self.left_sidebar_width + int(game_instance.paddle1.x * scale_x), int(game_instance.paddle1.y * scale_y)))
-
-
-        paddle2_rect = pygame.Rect(
-            self.left_sidebar_width + int(game_instance.paddle2.x * scale_x),
-            int(game_instance.paddle2.y * scale_y),
-            int(game_instance.paddle2.width * scale_x),
-            int(game_instance.paddle2.height * scale_y)
-        )
-        # black paddle2 labbel that fits inside the pattle perfectly vertically
-        # the label will scale with the paddle and the text will be centered inside the padel
-        paddle2_label = self.font.render("Paddle 2", True, (0, 0, 0))
-        self.screen.blit(paddle2_label, (self.left_sidebar_width + int(game_instance.paddle2.x * scale_x), int(game_instance.paddle2.y * scale_y)))
-
-        pygame.draw.rect(self.screen, (255, 255, 255), paddle1_rect)
-        pygame.draw.rect(self.screen, (255, 255, 255), paddle2_rect)
-
-        # Draw ball
+        paddle_rects = [
+            pygame.Rect(
+                self.left_sidebar_width + int(paddle.x * scale_x),
+                int(paddle.y * scale_y),
+                int(paddle.width * scale_x),
+                int(paddle.height * scale_y)
+            )
+            for paddle in (game_instance.paddle1, game_instance.paddle2)
+        ]
         ball_rect = pygame.Rect(
             self.left_sidebar_width + int(game_instance.ball.x * scale_x),
             int(game_instance.ball.y * scale_y),
             int(game_instance.ball.size * scale_x),
             int(game_instance.ball.size * scale_y)
         )
-        pygame.draw.rect(self.screen, (255, 255, 255), ball_rect)
 
-        # Draw scores
-        score1_text = self.font.render(str(game_instance.score1), True, (255, 255, 255))
-        score2_text = self.font.render(str(game_instance.score2), True, (255, 255, 255))
-        self.screen.blit(score1_text, (int(self.screen.get_width() * 0.4), int(self.screen.get_height() * 0.05)))
-        self.screen.blit(score2_text, (int(self.screen.get_width() * 0.6), int(self.screen.get_height() * 0.05)))
+        # Draw ball trail and glows underneath the paddles and ball
+        if game_instance.show_trails:
+            items.append(self.trail_item(game_instance, ball_rect))
+        else:
+            self.trail_count = 0
+        glow_intensity = int(game_instance.glow_intensity)
+        if glow_intensity > 0:
+            for name, rect in (("paddle1_glow", paddle_rects[0]), ("paddle2_glow", paddle_rects[1]), ("ball_glow", ball_rect)):
+                items.append(self.glow_item(name, rect, glow_intensity))
+
+        # Draw paddles
+        for name, paddle_rect in zip(("Paddle 1", "Paddle 2"), paddle_rects):
+            # black paddle label that fits inside the paddle perfectly vertically
+            # the label will scale with the paddle and the text will be centered inside the paddle
+            label = self.render_text(name, (0, 0, 0))
+            label_rect = label.get_rect(topleft=paddle_rect.topleft)
+            items.append((name, None, paddle_rect.union(label_rect), self.draw_paddle(label, label_rect, paddle_rect)))
 
-        # Draw current difficulty level based on ball speed
-    
+        # Draw ball
+        items.append(("ball", None, ball_rect, lambda: pygame.draw.rect(self.screen, (255, 255, 255), ball_rect)))
+
+        # Draw scores
+        items.append(self.text_item("score1", str(game_instance.score1), (255, 255, 255), topleft=self.layout['score1']))
+        items.append(self.text_item("score2", str(game_instance.score2), (255, 255, 255), topleft=self.layout['score2']))
 
         # Draw left sidebar
-        self.draw_left_sidebar(game_instance)
+        items.append(self.agent_data_item("agent1_data", game_instance.agent1, *self.layout['agent1_data']))
+        items.append(self.agent_data_item("agent2_data", game_instance.agent2, *self.layout['agent2_data']))
 
         # Draw right sidebar (console output)
-        self.draw_right_sidebar()
+        items.append(self.console_item())
 
         # Draw pause indicator
         if paused:
-            pause_text = self.font.render("PAUSED", True, (255, 0, 0))
-            pause_rect = pause_text.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() // 2))
-            self.screen.blit(pause_text, pause_rect)
+            items.append(self.text_item("paused", "PAUSED", (255, 0, 0), center=self.layout['paused']))
 
         # Draw training mode indicator
         if training_mode:
-            training_text = self.font.render("TRAINING MODE", True, (0, 255, 0))
-            training_rect = training_text.get_rect(center=(self.screen.get_width() // 2, int(self.screen.get_height() * 0.05)))
-            self.screen.blit(training_text, training_rect)
+            items.append(self.text_item("training", "TRAINING MODE", (0, 255, 0), center=self.layout['training']))
 
-        # Draw neural network visualizations
-        if self.show_network_agent1 and isinstance(game_instance.agent1, Agent):
-            state1 = game_instance.get_state(game_instance.paddle1, game_instance.paddle2)
-            activations1 = game_instance.agent1.get_network_activations(state1)
-            self.network_visualizer.draw_network(game_instance.agent1.policy_net, activations1, game_area)
-
-        if self.show_network_agent2 and isinstance(game_instance.agent2, Agent):
-            state2 = game_instance.get_state(game_instance.paddle2, game_instance.paddle1)
-            activations2 = game_instance.agent2.get_network_activations(state2)
-            self.network_visualizer.draw_network(game_instance.agent2.policy_net, activations2, game_area)
+        # Draw neural network visualizations; activations change every frame, so their key never matches
+        if self.show_network_agent1 and hasattr(game_instance.agent1, 'policy_net'):
+            items.append(("network1", object(), game_area, lambda: self.draw_network(game_instance, 1, game_area)))
+        if self.show_network_agent2 and hasattr(game_instance.agent2, 'policy_net'):
+            items.append(("network2", object(), game_area, lambda: self.draw_network(game_instance, 2, game_area)))
 
         # Draw confidence meters
         confidence1, confidence2 = game_instance.get_confidence()
-        self.draw_confidence_meter(confidence1, "Agent 1", int(self.screen.get_width() * 0.25), int(self.screen.get_height() * 0.95))
-        self.draw_confidence_meter(confidence2, "Agent 2", int(self.screen.get_width() * 0.55), int(self.screen.get_height() * 0.95))
+        items.append(self.confidence_meter_item("confidence1", confidence1, "Agent 1", *self.layout['confidence1']))
+        items.append(self.confidence_meter_item("confidence2", confidence2, "Agent 2", *self.layout['confidence2']))
 
         # Draw performance bar
-        self.draw_performance_bar(game_instance)
+        items.append(self.performance_bar_item(game_instance))
 
         # Draw current difficulty level
-        difficulty_text = self.font.render(f"Difficulty: {game_instance.difficulty:.2f}x", True, (255, 255, 255))
-        self.screen.blit(difficulty_text, (int(self.screen.get_width() * 0.8), int(self.screen.get_height() * 0.05)))
-
-        # Update and draw UI elements
-        self.manager.update(pygame.time.get_ticks() / 1000.0)
-        self.manager.draw_ui(self.screen)
+        items.append(self.text_item("difficulty", f"Difficulty: {game_instance.difficulty:.2f}x", (255, 255, 255), topleft=self.layout['difficulty']))
+
+        if self.show_frame_time:
+            items.append(self.text_item("frame_time", f"Draw: {self.draw_time * 1000:.2f} ms", (255, 255, 255), topleft=self.layout['frame_time']))
+
+        if profiler.enabled:
+            # Columns are placed separately since the font is proportional
+            x, y = self.layout['profiler']
+            columns = [x] + [x + int(self.font_size * (5.5 + 2.5 * i)) for i in range(4)]
+            for i, row in enumerate(profiler.summary()):
+                for j, text in enumerate(row):
+                    position = (columns[j], y + i * self.layout['console_line_height'])
+                    items.append(self.text_item(f"profiler_{i}_{j}", text, (255, 255, 0), topleft=position))
+
+        if status:
+            items.append(self.text_item("status", status, (255, 255, 0), topleft=self.layout['status']))
+
+        # Draw UI elements; the buttons only change look when hovered or pressed
+        buttons = [self.show_agent1_network_button, self.show_agent2_network_button, self.save_game_button, self.main_menu_button]
+        key = tuple((button.hovered, button.held, button.is_enabled) for button in buttons)
+        rect = buttons[0].rect.unionall([button.rect for button in buttons[1:]])
+        items.append(("ui", key, rect, lambda: self.manager.draw_ui(self.screen)))
+        return items
+
+    def text_item(self, name, text, color, size=None, **position):
+        surface = self.render_text(text, color, size)
+        rect = surface.get_rect(**position)
+        return (name, text, rect, lambda: self.screen.blit(surface, rect))
+
+    def trail_item(self, game_instance, ball_rect):
+        length = min(int(game_instance.trail_length), self.max_trail_length)  # Sliders store floats
+        if game_instance is not self.last_instance or ball_rect.size != self.trail_strip_key[0]:
+            self.trail_count = 0
+        if self.trail_strip_key != (ball_rect.size, length):
+            self.build_trail_strip(ball_rect.size, length)
+
+        # Previous positions, newest first, then the current one goes into the ring buffer
+        positions = [tuple(self.trail_positions[(self.trail_head - 1 - i) % self.max_trail_length])
+                     for i in range(min(self.trail_count, length))]
+        self.trail_positions[self.trail_head] = ball_rect.topleft
+        self.trail_head = (self.trail_head + 1) % self.max_trail_length
+        self.trail_count = min(self.trail_count + 1, self.max_trail_length)
+
+        width, height = ball_rect.size
+        rects = [pygame.Rect(position, ball_rect.size) for position in positions]
+        rect = ball_rect.unionall(rects)
+
+        def draw():
+            for i, trail_rect in enumerate(rects):
+                self.screen.blit(self.trail_strip, trail_rect, pygame.Rect(i * width, 0, width, height))
+        return ("trail", tuple(positions), rect, draw)
+
+    def build_trail_strip(self, size, length):
+        # One sprite per trail position side by side, fading out with age
+        width, height = size
+        self.trail_strip = pygame.Surface((max(1, width * length), max(1, height)), pygame.SRCALPHA)
+        for i in range(length):
+            alpha = int(128 * (1 - i / length))
+            self.trail_strip.fill((255, 255, 255, alpha), (i * width, 0, width, height))
+        self.trail_strip_key = (size, length)
+
+    def glow_item(self, name, rect, intensity):
+        sprite = self.get_glow_sprite(rect.size, intensity)
+        glow_rect = sprite.get_rect(center=rect.center)
+        return (name, None, glow_rect, lambda: self.screen.blit(sprite, glow_rect))
+
+    def get_glow_sprite(self, size, intensity):
+        key = (size, intensity)
+        sprite = self.glow_sprites.get(key)
+        if sprite is None:
+            if len(self.glow_sprites) >= 16:
+                self.glow_sprites.clear()
+            width, height = size
+            spread = max(4, min(width, height))
+            sprite = pygame.Surface((width + 2 * spread, height + 2 * spread), pygame.SRCALPHA)
+            sprite.fill((255, 255, 255, intensity), (spread, spread, width, height))
+            # Blur by shrinking and scaling back up
+            small = pygame.transform.smoothscale(sprite, (max(1, sprite.get_width() // 4), max(1, sprite.get_height() // 4)))
+            sprite = pygame.transform.smoothscale(small, sprite.get_size())
+            self.glow_sprites[key] = sprite
+        return sprite
+
+    def draw_paddle(self, label, label_rect, paddle_rect):
+        def draw():
+            self.screen.blit(label, label_rect)
+            pygame.draw.rect(self.screen, (255, 255, 255), paddle_rect)
+        return draw
+
+    def draw_network(self, game_instance, agent_number, game_area):
+        agent = game_instance.agent1 if agent_number == 1 else game_instance.agent2
+        state = game_instance.get_states()[agent_number - 1]
+        start = time.perf_counter()
+        activations = agent.get_network_activations(state)
+        self.network_visualizer.draw_network(agent.policy_net, activations, game_area)
+        profiler.record('network_view', start)
+
+    def render_text(self, text, color, size=None):
+        return self.text_cache.render(text, color, size or self.font_size)
 
     def process_event(self, event):
         self.manager.process_events(event)
@@ -212,32 +433,44 @@ class GameUI:
         elif agent == "agent2":
             self.show_network_agent2 = not self.show_network_agent2
 
-    def draw_left_sidebar(self, game_instance):
-        pygame.draw.rect(self.screen, (30, 30, 30), (0, 0, self.left_sidebar_width, self.screen.get_height()))
-        
-        # Agent 1 data
-        self.draw_agent_data(game_instance.agent1, "Agent 1", int(self.screen.get_width() * 0.01), int(self.screen.get_height() * 0.05))
-        
-        # Agent 2 data
-        self.draw_agent_data(game_instance.agent2, "Agent 2", int(self.screen.get_width() * 0.01), int(self.screen.get_height() * 0.5))
-
-    def draw_right_sidebar(self):
-        pygame.draw.rect(self.screen, (30, 30, 30), (self.screen.get_width() - self.right_sidebar_width, 0, self.right_sidebar_width, self.screen.get_height()))
-        
-        title = self.font.render("Console Output", True, (255, 255, 255))
-        self.screen.blit(title, (self.screen.get_width() - self.right_sidebar_width + 10, 10))
-
-        for i, message in enumerate(self.console_messages):
-            text_surface = self.font.render(message, True, (200, 200, 200))
-            self.screen.blit(text_surface, (self.screen.get_width() - self.right_sidebar_width + 10, 50 + i * int(self.screen.get_height() * 0.03)))
-
-    def add_console_message(self, message):
-        self.console_messages.append(message)
-
-    def draw_agent_data(self, agent, name, x, y):
-        title = self.font.render(name, True, (255, 255, 255))
-        self.screen.blit(title, (x, y))
-        
+    def console_item(self):
+        now = time.time()
+        self.expire_console_messages(now)
+        x, y = self.layout['console']
+        lines = []
+        for i, (message, count, last_seen) in enumerate(self.console_messages):
+            text = message if count == 1 else f"{message} x{count}"
+            fade = min(1.0, (self.message_lifetime - (now - last_seen)) / self.message_fade_time)
+            fade = round(fade * self.message_fade_steps) / self.message_fade_steps
+            # Fade towards the sidebar color instead of using per-surface alpha
+            color = tuple(int(background + (foreground - background) * fade) for foreground, background in zip((200, 200, 200), (30, 30, 30)))
+            text_surface = self.render_text(text, color)
+            lines.append((text, color, text_surface, text_surface.get_rect(topleft=(x, y + i * self.layout['console_line_height']))))
+        rect = pygame.Rect(x, y, 0, 0).unionall([line[3] for line in lines])
+
+        def draw():
+            for text, color, text_surface, line_rect in lines:
+                self.screen.blit(text_surface, line_rect)
+        return ("console", tuple((text, color) for text, color, _, _ in lines), rect, draw)
+
+    def add_console_message(self, message, count=1):
+        now = time.time()
+        for entry in self.console_messages:
+            if entry[0] == message:
+                # Repeats are coalesced into one line, moved to the bottom
+                self.console_messages.remove(entry)
+                entry[1] += count
+                entry[2] = now
+                self.console_messages.append(entry)
+                return
+        self.console_messages.append([message, count, now])
+
+    def expire_console_messages(self, now):
+        # Entries are ordered by last occurrence, so expired ones are at the front
+        while self.console_messages and now - self.console_messages[0][2] >= self.message_lifetime:
+            self.console_messages.popleft()
+
+    def agent_data_item(self, name, agent, x, y):
         data = [f"Type: {agent.__class__.__name__}"]
         
         if hasattr(agent, 'epsilon'):
@@ -255,34 +488,37 @@ class GameUI:
         else:
             data.append("Last Reward: N/A")
 
+        lines = []
         for i, text in enumerate(data):
-            text_surface = self.font.render(text, True, (200, 200, 200))
-            self.screen.blit(text_surface, (x, y + int(self.screen.get_height() * 0.05) + i * int(self.screen.get_height() * 0.04)))
+            text_surface = self.render_text(text, (200, 200, 200))
+            lines.append((text_surface, text_surface.get_rect(topleft=(x, y + self.layout['data_offset'] + i * self.layout['data_line_height']))))
+        rect = lines[0][1].unionall([line_rect for _, line_rect in lines[1:]])
 
-    def draw_confidence_meter(self, confidence, agent_name, x, y):
-        bar_width = int(self.screen.get_width() * 0.2)
-        bar_height = int(self.screen.get_height() * 0.02)
+        def draw():
+            for text_surface, line_rect in lines:
+                self.screen.blit(text_surface, line_rect)
+        return (name, tuple(data), rect, draw)
 
-        # Draw background
-        pygame.draw.rect(self.screen, (100, 100, 100), (x, y, bar_width, bar_height))
-        
-        # Draw confidence
+    def confidence_meter_item(self, name, confidence, agent_name, x, y):
+        bar_width, bar_height = self.layout['confidence_bar']
         confidence_width = int(bar_width * confidence)
-        pygame.draw.rect(self.screen, (0, 255, 0), (x, y, confidence_width, bar_height))
-
-        # Draw text
-        text = self.font.render(f"{agent_name} Confidence: {confidence:.2f}", True, (255, 255, 255))
+        text = self.render_text(f"{agent_name} Confidence: {confidence:.2f}", (255, 255, 255))
         text_rect = text.get_rect(center=(x + bar_width // 2, y - bar_height))
-        self.screen.blit(text, text_rect)
 
-    def draw_performance_bar(self, game_instance):
-        bar_width = int(self.screen.get_width() * 0.4)
-        bar_height = int(self.screen.get_height() * 0.03)
-        bar_x = (self.screen.get_width() - bar_width) // 2
-        bar_y = int(self.screen.get_height() * 0.02)
+        def draw():
+            # Draw background
+            pygame.draw.rect(self.screen, (100, 100, 100), (x, y, bar_width, bar_height))
+            
+            # Draw confidence
+            pygame.draw.rect(self.screen, (0, 255, 0), (x, y, confidence_width, bar_height))
+
+            # Draw text
+            self.screen.blit(text, text_rect)
+        rect = pygame.Rect(x, y, bar_width, bar_height).union(text_rect)
+        return (name, (confidence_width, f"{confidence:.2f}"), rect, draw)
 
-        # Draw background
-        pygame.draw.rect(self.screen, (100, 100, 100), (bar_x, bar_y, bar_width, bar_height))
+    def performance_bar_item(self, game_instance):
+        bar_x, bar_y, bar_width, bar_height = self.layout['performance_bar']
 
         # Calculate the performance ratio
         performance_ratio = game_instance.get_performance_ratio()
@@ -290,25 +526,37 @@ class GameUI:
         # Calculate the division point
         division_point = int(bar_width * performance_ratio)
 
-        # Draw Agent 1's portion (left side)
-        pygame.draw.rect(self.screen, (0, 255, 0), (bar_x, bar_y, division_point, bar_height))
+        # Labels
+        label_size = int(bar_height * 0.8)
+        agent1_label = f"Agent 1: {game_instance.score1} ({game_instance.total_hits1})"
+        agent2_label = f"Agent 2: {game_instance.score2} ({game_instance.total_hits2})"
+        percentage_text = f"{performance_ratio * 100:.1f}% - {100 - performance_ratio * 100:.1f}%"
+        agent1_text = self.render_text(agent1_label, (255, 255, 255), label_size)
+        agent2_text = self.render_text(agent2_label, (255, 255, 255), label_size)
+        percentage_surface = self.render_text(percentage_text, (255, 255, 255), label_size)
+        agent1_rect = agent1_text.get_rect(topleft=(bar_x - agent1_text.get_width() - 5, bar_y + (bar_height - agent1_text.get_height()) // 2))
+        agent2_rect = agent2_text.get_rect(topleft=(bar_x + bar_width + 5, bar_y + (bar_height - agent2_text.get_height()) // 2))
+        percentage_rect = percentage_surface.get_rect(center=(bar_x + bar_width // 2, bar_y + bar_height + 5))
 
-        # Draw Agent 2's portion (right side)
-        pygame.draw.rect(self.screen, (255, 0, 0), (bar_x + division_point, bar_y, bar_width - division_point, bar_height))
+        def draw():
+            # Draw background
+            pygame.draw.rect(self.screen, (100, 100, 100), (bar_x, bar_y, bar_width, bar_height))
 
-        # Draw dividing line
-        pygame.draw.line(self.screen, (255, 255, 255), (bar_x + bar_width // 2, bar_y), (bar_x + bar_width // 2, bar_y + bar_height), 2)
+            # Draw Agent 1's portion (left side)
+            pygame.draw.rect(self.screen, (0, 255, 0), (bar_x, bar_y, division_point, bar_height))
 
-        # Draw labels
-        font = pygame.font.Font(None, int(bar_height * 0.8))
-        agent1_text = font.render(f"Agent 1: {game_instance.score1} ({game_instance.total_hits1})", True, (255, 255, 255))
-        agent2_text = font.render(f"Agent 2: {game_instance.score2} ({game_instance.total_hits2})", True, (255, 255, 255))
-        self.screen.blit(agent1_text, (bar_x - agent1_text.get_width() - 5, bar_y + (bar_height - agent1_text.get_height()) // 2))
-        self.screen.blit(agent2_text, (bar_x + bar_width + 5, bar_y + (bar_height - agent2_text.get_height()) // 2))
+            # Draw Agent 2's portion (right side)
+            pygame.draw.rect(self.screen, (255, 0, 0), (bar_x + division_point, bar_y, bar_width - division_point, bar_height))
 
-        # Draw percentage text
-        percentage_text = f"{performance_ratio * 100:.1f}% - {100 - performance_ratio * 100:.1f}%"
-        percentage_surface = font.render(percentage_text, True, (255, 255, 255))
-        percentage_rect = percentage_surface.get_rect(center=(bar_x + bar_width // 2, bar_y + bar_height + 5))
-        self.screen.blit(percentage_surface, percentage_rect)
+            # Draw dividing line
+            pygame.draw.line(self.screen, (255, 255, 255), (bar_x + bar_width // 2, bar_y), (bar_x + bar_width // 2, bar_y + bar_height), 2)
+
+            # Draw labels
+            self.screen.blit(agent1_text, agent1_rect)
+            self.screen.blit(agent2_text, agent2_rect)
+
+            # Draw percentage text
+            self.screen.blit(percentage_surface, percentage_rect)
 
+        rect = pygame.Rect(bar_x, bar_y, bar_width, bar_height).unionall([agent1_rect, agent2_rect, percentage_rect])
+        return ("performance", (division_point, agent1_label, agent2_label, percentage_text), rect, draw)
@@ -22,6 +22,14 @@ class DemoGame:
         self.target_y1 = self.paddle1_y
         self.target_y2 = self.paddle2_y
 
+        # Pre-rendered layers, rebuilt when the size, opacity or glow intensity changes
+        self.glow_size = 10
+        self.glow_intensity = 180
+        self.sprite_key = None
+        self.background = None
+        self.paddle_sprite = None
+        self.ball_sprite = None
+
     def predict_ball_y(self, paddle_x):
         # Calculate time until ball reaches paddle
         time_to_paddle = (paddle_x - self.ball_x) / self.ball_dx
@@ -74,51 +82,48 @@ class DemoGame:
             self.ball_y = self.height // 2
 
     def draw(self, screen, alpha=64):
-        # Create a transparent surface
-        surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        
-        # Draw center line
+        if self.sprite_key != (self.width, self.height, alpha, self.glow_intensity):
+            self.build_sprites(alpha)
+
+        # Background and center line are one opaque layer; paddles and ball are blended sprites
+        screen.blit(self.background, (0, 0))
+        glow_size = self.glow_size
+        screen.blit(self.paddle_sprite, (self.paddle_width - glow_size, int(self.paddle1_y) - glow_size))
+        screen.blit(self.paddle_sprite, (self.width - self.paddle_width * 2 - glow_size, int(self.paddle2_y) - glow_size))
+        radius = self.ball_size + glow_size
+        screen.blit(self.ball_sprite, (int(self.ball_x) - radius, int(self.ball_y) - radius))
+
+    def build_sprites(self, alpha):
+        """Pre-render everything draw needs for this size, opacity and glow intensity"""
+        self.sprite_key = (self.width, self.height, alpha, self.glow_intensity)
+        glow_size = self.glow_size
+        # The default intensity of 180 gives the original half-opacity glow
+        glow_alpha = min(255, int(alpha * self.glow_intensity) // 360)
+
+        # Draw center line over a subtle background
+        self.background = pygame.Surface((self.width, self.height))
+        self.background.fill((20, 20, 30))
+        center_line = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
         center_line_width = 4
         dash_length = 20
         gap_length = 15
         for y in range(0, self.height, dash_length + gap_length):
-            pygame.draw.rect(surface, (128, 128, 128, alpha),
+            pygame.draw.rect(center_line, (128, 128, 128, alpha),
                            (self.width // 2 - center_line_width // 2, y,
                             center_line_width, dash_length))
+        self.background.blit(center_line, (0, 0))
 
-        # Draw paddles with a glowing effect
-        glow_size = 10
-        glow_alpha = alpha // 2
-        
-        # Left paddle glow
-        pygame.draw.rect(surface, (255, 255, 255, glow_alpha),
-                        (self.paddle_width - glow_size, self.paddle1_y - glow_size,
-                         self.paddle_width + 2*glow_size, self.paddle_height + 2*glow_size))
-        
-        # Right paddle glow
-        pygame.draw.rect(surface, (255, 255, 255, glow_alpha),
-                        (self.width - self.paddle_width * 2 - glow_size, self.paddle2_y - glow_size,
-                         self.paddle_width + 2*glow_size, self.paddle_height + 2*glow_size))
-        
-        # Draw actual paddles
-        pygame.draw.rect(surface, (255, 255, 255, alpha), 
-                        (self.paddle_width, self.paddle1_y,
-                         self.paddle_width, self.paddle_height))
-        pygame.draw.rect(surface, (255, 255, 255, alpha), 
-                        (self.width - self.paddle_width * 2, self.paddle2_y,
-                         self.paddle_width, self.paddle_height))
-        
-        # Draw ball with a glowing effect
-        pygame.draw.circle(surface, (255, 255, 255, glow_alpha),
-                         (int(self.ball_x), int(self.ball_y)),
-                         self.ball_size + glow_size)
-        pygame.draw.circle(surface, (255, 255, 255, alpha),
-                         (int(self.ball_x), int(self.ball_y)),
-                         self.ball_size)
-        
-        # Draw to screen with a subtle background
-        pygame.draw.rect(screen, (20, 20, 30), (0, 0, self.width, self.height))
-        screen.blit(surface, (0, 0))
+        # Paddle with a glowing effect
+        self.paddle_sprite = pygame.Surface((self.paddle_width + 2*glow_size, self.paddle_height + 2*glow_size), pygame.SRCALPHA)
+        self.paddle_sprite.fill((255, 255, 255, glow_alpha))
+        pygame.draw.rect(self.paddle_sprite, (255, 255, 255, alpha),
+                        (glow_size, glow_size, self.paddle_width, self.paddle_height))
+
+        # Ball with a glowing effect
+        radius = self.ball_size + glow_size
+        self.ball_sprite = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
+        pygame.draw.circle(self.ball_sprite, (255, 255, 255, glow_alpha), (radius, radius), radius)
+        pygame.draw.circle(self.ball_sprite, (255, 255, 255, alpha), (radius, radius), self.ball_size)
 
 class MainMenu:
     def __init__(self, screen, settings):
@@ -138,6 +143,15 @@ class MainMenu:
     def process_event(self, event):
         self.manager.process_events(event)
 
+    def resize(self, screen):
+        # Rebuild the labels, buttons and demo game for the new window size
+        self.screen = screen
+        self.manager.set_window_resolution(screen.get_size())
+        self.manager.clear_and_reset()
+        self.demo_game = DemoGame(screen.get_width(), screen.get_height())
+        self.settings.apply_settings_to_demo(self.demo_game)
+        self.create_ui_elements()
+
     def create_ui_elements(self):
         screen_width = self.screen.get_width()
         screen_height = self.screen.get_height()
@@ -176,6 +190,8 @@ class MainMenu:
         buttons = [
             ("New Game", "new_game"),
             ("Load Game", "load_game"),
+            ("Play vs AI", "play_vs_ai"),
+            ("Watch Replay", "watch_replay"),
             ("Settings", "settings"),
         ]
 
@@ -7,56 +7,81 @@ class NetworkVisualizer:
     def __init__(self, screen, font):
         self.screen = screen
         self.font = font
+        self.node_radius = 5
+        self.node_spacing = 3 * self.node_radius  # Narrowest gap between drawn nodes before units are grouped
+        self.default_color = (200, 200, 200, 255)
+        # The edges only depend on the network shape and panel size, so they are drawn once
+        self.layout_key = None
+        self.edge_layer = None
+        self.node_positions = None
+        self.node_groups = None
 
     def draw_network(self, network, activations, game_area):
-        # Create a transparent surface for the network visualization
-        network_surface = pygame.Surface(game_area.size, pygame.SRCALPHA)
-        
         layers = [module for module in network.modules() if isinstance(module, torch.nn.Linear)]
         layer_sizes = [layer.in_features for layer in layers] + [layers[-1].out_features]
 
-        width, height = game_area.size
+        layout_key = (tuple(layer_sizes), game_area.size)
+        if layout_key != self.layout_key:
+            self.build_layout(layer_sizes, game_area.size)
+            self.layout_key = layout_key
+
+        self.screen.blit(self.edge_layer, game_area.topleft)
+
+        for i, (positions, groups) in enumerate(zip(self.node_positions, self.node_groups)):
+            colors = self.get_layer_colors(activations[i] if i < len(activations) else None, groups)
+            for (node_x, node_y), color in zip(positions, colors):
+                pygame.draw.circle(self.screen, color, (game_area.x + node_x, game_area.y + node_y), self.node_radius)
+
+    def build_layout(self, layer_sizes, size):
+        """Node positions per layer and the pre-rendered edges between consecutive layers.
+
+        Layers wider than the panel can show are drawn as groups of neighbouring units.
+        """
+        width, height = size
+        max_nodes = max(1, width // self.node_spacing)
         vertical_spacing = height / (len(layer_sizes) - 1)
-        
+
+        self.node_positions = []
+        self.node_groups = []
         for i, layer_size in enumerate(layer_sizes):
-            layer_y = i * vertical_spacing
-            horizontal_spacing = width / (layer_size + 1)
-            
-            for j in range(layer_size):
-                node_x = (j + 1) * horizontal_spacing
-                node_y = layer_y
-                
-                # Calculate color based on activation
-                if i < len(activations) and j < activations[i].shape[1]:
-                    activation = activations[i][0][j].item()
-                    color = self.get_color_from_activation(activation)
-                else:
-                    color = (200, 200, 200, 255)  # Default color
-                
-                pygame.draw.circle(network_surface, color, (int(node_x), int(node_y)), 5)
-                
-                if i < len(layer_sizes) - 1:
-                    next_layer_y = (i + 1) * vertical_spacing
-                    next_layer_size = layer_sizes[i + 1]
-                    next_horizontal_spacing = width / (next_layer_size + 1)
-                    
-                    for k in range(next_layer_size):
-                        next_node_x = (k + 1) * next_horizontal_spacing
-                        next_node_y = next_layer_y
-                        line_color = self.get_line_color(color, (200, 200, 200, 255))
-                        pygame.draw.line(network_surface, line_color, 
-                                         (int(node_x), int(node_y)), 
-                                         (int(next_node_x), int(next_node_y)), 1)
-
-        # Blit the network surface onto the game area
-        self.screen.blit(network_surface, game_area.topleft)
-
-    def get_color_from_activation(self, activation):
+            shown = min(layer_size, max_nodes)
+            # Group boundaries as offsets into the layer, so each drawn node can average its units
+            self.node_groups.append(np.linspace(0, layer_size, shown + 1).astype(int))
+            horizontal_spacing = width / (shown + 1)
+            self.node_positions.append([(int((j + 1) * horizontal_spacing), int(i * vertical_spacing)) for j in range(shown)])
+
+        self.edge_layer = pygame.Surface(size, pygame.SRCALPHA)
+        # Edges are no longer tinted per frame; they use the color a line from an idle node had
+        line_color = self.get_line_color((0, 0, 0, 255), self.default_color)
+        for positions, next_positions in zip(self.node_positions, self.node_positions[1:]):
+            for start in positions:
+                for end in next_positions:
+                    pygame.draw.line(self.edge_layer, line_color, start, end, 1)
+
+    def get_layer_colors(self, activation, groups):
+        # Mean activation per drawn node, mapped to colors in one pass
+        count = len(groups) - 1
+        colors = np.empty((count, 4), dtype=np.int64)
+        colors[:] = self.default_color
+        if activation is None:
+            return colors.tolist()
+
+        values = activation[0].cpu().numpy()
+        available = min(count, np.searchsorted(groups, len(values), side='right') - 1)
+        if available > 0:
+            sums = np.add.reduceat(values[:groups[available]], groups[:available])
+            means = sums / np.diff(groups[:available + 1])
+            colors[:available] = self.get_colors_from_activations(means)
+        return colors.tolist()
+
+    def get_colors_from_activations(self, activations):
         # Map activation to color: blue for negative, red for positive
-        if activation < 0:
-            return (0, 0, min(255, int(-activation * 255)), 255)
-        else:
-            return (min(255, int(activation * 255)), 0, 0, 255)
+        colors = np.zeros((len(activations), 4), dtype=np.int64)
+        intensity = np.minimum(255, (np.abs(activations) * 255).astype(np.int64))
+        colors[:, 0] = np.where(activations >= 0, intensity, 0)
+        colors[:, 2] = np.where(activations < 0, intensity, 0)
+        colors[:, 3] = 255
+        return colors
 
     def get_line_color(self, start_color, end_color):
         # Create a gradient color for the line
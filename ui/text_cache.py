@@ -0,0 +1,35 @@
+import pygame
+from collections import OrderedDict
+
+class TextCache:
+    """LRU cache of rendered text surfaces, keyed by text, color and font size"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.fonts = {}
+
+    def get_font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(None, size)
+            self.fonts[size] = font
+        return font
+
+    def render(self, text, color, size):
+        key = (text, tuple(color), size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = self.get_font(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)  # Drop the least recently used surface
+        return surface
+
+    def clear(self):
+        # Sizes are derived from the window, so everything is stale after a resize
+        self.surfaces.clear()
+        self.fonts.clear()
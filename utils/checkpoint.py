@@ -0,0 +1,548 @@
+import copy
+import glob
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import numpy as np
+import torch
+from ai.agent import Agent, PrioritizedReplayBuffer
+from ai.policy_agent import PolicyAgent
+from ai.random_agent import RandomAgent
+from game.human_player import HumanPlayer
+
+# Checkpoints are directories instead of a single pickle:
+#   generation_0001/
+#     manifest.json            scores, settings and per-agent scalars
+#     agent1/policy.pt         torch state_dicts
+#     agent1/target.pt
+#     agent1/optimizer.pt
+#     agent1/inference.pt      policy weights and metadata only, for play-only agents
+#   replay/agent1/segment_<buffer id>_0001.npz
+# They are written to "<name>.tmp" first and renamed into place once complete.
+# Replay is stored as append-only segments shared between generations: each holds the
+# rows added and the priorities changed since the previous save, and a manifest lists
+# the segments that rebuild its buffer.
+# index.jsonl next to them is an append-only log of saved and pruned generations.
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'index.jsonl'
+FORMAT_VERSION = 1
+TEMP_SUFFIX = '.tmp'
+REPLAY_DIRECTORY = 'replay'
+DEMONSTRATION_DIRECTORY = 'demonstrations'
+LEGACY_PATTERN = 'generation_*.pkl'  # Whole-game pickles written before checkpoints were directories
+
+AGENT_TYPES = {
+    Agent: 'dqn',
+    RandomAgent: 'random',
+    HumanPlayer: 'human',
+}
+
+
+def get_agent_type(agent):
+    return AGENT_TYPES.get(type(agent), 'random')
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME), 'r') as f:
+        return json.load(f)
+
+
+def is_checkpoint(directory):
+    return not directory.endswith(TEMP_SUFFIX) and os.path.isfile(os.path.join(directory, MANIFEST_NAME))
+
+
+def snapshot_agent(agent, include_replay=True):
+    """Copy everything needed to save an agent so it can be written off the game thread"""
+    snapshot = {'entry': {'type': get_agent_type(agent)}}
+    if not isinstance(agent, Agent):
+        return snapshot
+
+    snapshot['entry'].update(agent.scalar_state())
+    snapshot['policy'] = _copy_state_dict(agent.policy_net.state_dict())
+    snapshot['target'] = _copy_state_dict(agent.target_net.state_dict())
+    snapshot['optimizer'] = copy.deepcopy(agent.optimizer.state_dict())
+    if include_replay and len(agent.memory) > 0:
+        snapshot['replay'] = agent.memory.snapshot()
+    return snapshot
+
+
+def write_snapshot(snapshot, directory):
+    """Write a game snapshot to a temp directory, fsync it and rename it into place"""
+    # Snapshots queued before an earlier save failed still list that save's segment
+    for name, agent_snapshot in snapshot['agents'].items():
+        replay = agent_snapshot.get('replay')
+        if replay:
+            failed = [segment for segment in replay['segments'] if segment in replay['memory'].failed_segments]
+            if failed:
+                raise RuntimeError(f"{name} replay builds on {failed[0]}, which failed to save")
+
+    temp_directory = directory + TEMP_SUFFIX
+    if os.path.exists(temp_directory):
+        shutil.rmtree(temp_directory)
+    os.makedirs(temp_directory)
+    replay_root = get_replay_root(directory)
+
+    manifest = dict(snapshot['manifest'])
+    manifest['agents'] = {}
+    for name, agent_snapshot in snapshot['agents'].items():
+        manifest['agents'][name] = _write_agent(agent_snapshot, os.path.join(temp_directory, name),
+                                                os.path.join(replay_root, name), manifest)
+
+    _write_file(os.path.join(temp_directory, MANIFEST_NAME),
+                lambda f: f.write(json.dumps(manifest, indent=4).encode('utf-8')))
+    _fsync_directory(temp_directory)
+
+    # Never index a generation that cannot be loaded again
+    missing = missing_segments(directory, manifest)
+    if missing:
+        raise FileNotFoundError(f"replay segments missing after save: {', '.join(missing)}")
+
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.replace(temp_directory, directory)
+    _fsync_directory(os.path.dirname(os.path.abspath(directory)))
+
+
+def discard_snapshot(snapshot):
+    # Rows from a snapshot that failed to write go into the next segment instead
+    for agent_snapshot in snapshot['agents'].values():
+        if 'replay' in agent_snapshot:
+            agent_snapshot['replay']['memory'].discard_snapshot(agent_snapshot['replay'])
+
+
+def get_replay_root(directory):
+    return os.path.join(os.path.dirname(os.path.abspath(directory)), REPLAY_DIRECTORY)
+
+
+def remove_incomplete(save_directory):
+    # Leftovers from a crash mid-write are never valid checkpoints
+    for name in os.listdir(save_directory):
+        if name.endswith(TEMP_SUFFIX):
+            shutil.rmtree(os.path.join(save_directory, name), ignore_errors=True)
+
+
+def missing_segments(directory, manifest):
+    """Replay segments listed by a checkpoint's manifest that are not on disk"""
+    replay_root = get_replay_root(directory)
+    missing = []
+    for name, entry in manifest['agents'].items():
+        for segment_name in entry.get('replay', {}).get('segments', []):
+            if not os.path.exists(os.path.join(replay_root, name, f'{segment_name}.npz')):
+                missing.append(f'{name}/{segment_name}')
+    return missing
+
+
+def load_agent(directory, entry, settings, load_optimizer=True, load_replay=True, learner=None):
+    agent_type = entry['type']
+    if agent_type == 'human':
+        return HumanPlayer(settings)
+    if agent_type == 'random':
+        return RandomAgent(settings)
+
+    agent = Agent(settings, learner)
+    agent.policy_net.load_state_dict(_load_tensors(os.path.join(directory, 'policy.pt'), agent.device))
+    agent.target_net.load_state_dict(_load_tensors(os.path.join(directory, 'target.pt'), agent.device))
+    if load_optimizer:
+        agent.optimizer.load_state_dict(_load_tensors(os.path.join(directory, 'optimizer.pt'), agent.device))
+    agent.load_scalar_state(entry)
+
+    if load_replay and 'replay' in entry:
+        replay_directory = os.path.join(get_replay_root(os.path.dirname(directory)), os.path.basename(directory))
+        agent.memory.reserve(entry['replay']['length'], entry['replay']['position'], entry['replay']['segments'])
+        load_segments(agent.memory, replay_directory, entry['replay']['segments'])
+    return agent
+
+
+def find_legacy_saves(save_directory):
+    """Legacy pickle saves, oldest first"""
+    return sorted(glob.glob(os.path.join(save_directory, LEGACY_PATTERN)), key=os.path.getctime)
+
+
+def convert_legacy_agent(old_agent, settings):
+    """Rebuild an agent unpickled from a legacy save with the current classes"""
+    if not isinstance(old_agent, Agent):
+        return RandomAgent(settings)
+
+    agent = Agent(settings)
+    agent.policy_net.load_state_dict(old_agent.policy_net.state_dict())
+    agent.target_net.load_state_dict(old_agent.target_net.state_dict())
+    agent.optimizer.load_state_dict(old_agent.optimizer.state_dict())
+    agent.epsilon = old_agent.epsilon
+    agent.beta = getattr(old_agent, 'beta', agent.beta)
+    agent.rebounds = getattr(old_agent, 'rebounds', 0)
+
+    rows = list(old_agent.memory.buffer)
+    if rows:
+        agent.memory.reserve(len(rows), len(rows) % agent.memory.capacity, [])
+        agent.memory.fill(0, rows, old_agent.memory.priorities[:len(rows)])
+        # Nothing is on disk yet, so the next save writes every row
+        agent.memory.total_added = len(rows)
+    return agent
+
+
+def load_policy(directory, name, settings):
+    """Build a play-only agent from a checkpoint, reading only its inference export"""
+    manifest = read_manifest(directory)
+    if manifest.get('shared_replay'):
+        # agent2 only holds a periodically synced copy of the learner; agent1's policy,
+        # which expects agent2's view mirrored, plays either side
+        name = 'agent1'
+    entry = manifest['agents'][name]
+    if entry['type'] == 'dqn':
+        return PolicyAgent.load(os.path.join(directory, name, 'inference.pt'), settings)
+    return load_agent(os.path.join(directory, name), entry, settings, load_optimizer=False, load_replay=False)
+
+
+def read_segment(replay_directory, segment_name):
+    with np.load(os.path.join(replay_directory, f'{segment_name}.npz')) as segment:
+        return {name: segment[name] for name in segment.files}
+
+
+def load_segments(memory, replay_directory, segment_names, chunk_size=50000):
+    # Segments are applied oldest first, so newer rows and priorities win
+    for segment_name in segment_names:
+        segment = read_segment(replay_directory, segment_name)
+        start = int(segment['start'])
+        actions = segment['actions'].tolist()
+        rewards = segment['rewards'].tolist()
+        for offset in range(0, len(actions), chunk_size):
+            end = min(offset + chunk_size, len(actions))
+            rows = list(zip(segment['states'][offset:end], actions[offset:end],
+                            rewards[offset:end], segment['next_states'][offset:end]))
+            memory.fill((start + offset) % memory.capacity, rows, segment['priorities'][offset:end])
+        memory.apply_priority_delta(segment['delta_indices'], segment['delta_values'])
+
+
+def save_demonstrations(memory, directory):
+    """Write a human player's transitions as a replay segment"""
+    os.makedirs(directory, exist_ok=True)
+    name = base = time.strftime('demo_%Y%m%d_%H%M%S')
+    # Recording can be toggled more than once a second
+    suffix = 1
+    while os.path.exists(os.path.join(directory, f'{name}.npz')):
+        suffix += 1
+        name = f'{base}_{suffix}'
+    segment = PrioritizedReplayBuffer.snapshot_to_segment(memory.snapshot(name))
+    path = os.path.join(directory, f'{name}.npz')
+    _write_file(path + TEMP_SUFFIX, lambda f: np.savez(f, **segment))
+    os.replace(path + TEMP_SUFFIX, path)
+    return path
+
+
+def load_demonstrations(directory):
+    # All recorded demonstrations as one set of columns, or None if there are none
+    if not os.path.isdir(directory):
+        return None
+    segments = [read_segment(directory, os.path.splitext(name)[0])
+                for name in sorted(os.listdir(directory)) if name.endswith('.npz')]
+    segments = [segment for segment in segments if len(segment['actions'])]
+    if not segments:
+        return None
+    return {name: np.concatenate([segment[name] for segment in segments])
+            for name in ('states', 'actions', 'rewards', 'next_states')}
+
+
+class ReplayLoader:
+    """Streams saved replay segments into live buffers on a background thread"""
+
+    def __init__(self, jobs, warmup_fraction):
+        # jobs: (memory, replay directory, manifest replay entry)
+        self.jobs = jobs
+        self.finished = threading.Event()
+        self.error = None
+        for memory, _, replay_info in jobs:
+            # Reserved before the game adds anything, so new rows land after the saved ones
+            memory.reserve(replay_info['length'], replay_info['position'], replay_info['segments'])
+            memory.begin_loading(replay_info['length'], warmup_fraction)
+        self.thread = threading.Thread(target=self._run, name="replay-loader", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            for memory, directory, replay_info in self.jobs:
+                load_segments(memory, directory, replay_info['segments'])
+        except Exception as e:
+            self.error = e
+            for memory, _, _ in self.jobs:
+                memory.drop_placeholders()
+        finally:
+            for memory, _, _ in self.jobs:
+                memory.finish_loading()
+            self.finished.set()
+
+
+class CheckpointIndex:
+    """Append-only log of the generations in a save directory"""
+
+    def __init__(self, save_directory):
+        self.save_directory = save_directory
+        self.path = os.path.join(save_directory, INDEX_NAME)
+        self.lock = threading.Lock()
+        self.entries = {}  # generation -> entry, in save order
+        self.latest_generation = None
+        if os.path.exists(self.path):
+            self._read()
+        else:
+            self._rebuild()
+
+    def latest(self):
+        with self.lock:
+            if self.latest_generation is None:
+                return None
+            return self.entries[self.latest_generation]
+
+    def get_entries(self):
+        with self.lock:
+            return list(self.entries.values())
+
+    def add(self, directory, manifest):
+        entry = {
+            'generation': manifest['generation'],
+            'path': os.path.basename(directory),
+            'timestamp': manifest['timestamp'],
+            'size': _directory_size(directory),
+            'score1': manifest['score1'],
+            'score2': manifest['score2'],
+            'rating': manifest.get('rating'),
+        }
+        with self.lock:
+            self._track(entry)
+            self._append(entry)
+        return entry
+
+    def remove(self, generation):
+        with self.lock:
+            if self._untrack(generation):
+                self._append({'generation': generation, 'deleted': True})
+
+    def get_path(self, entry):
+        return os.path.join(self.save_directory, entry['path'])
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.latest_generation = None
+            open(self.path, 'w').close()
+
+    def _read(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A crash can leave the last line half-written
+                if entry.get('deleted'):
+                    self._untrack(entry['generation'])
+                else:
+                    self._track(entry)
+
+    def _rebuild(self):
+        # Saves written before the index existed are found through their manifests
+        manifests = []
+        for name in sorted(os.listdir(self.save_directory)):
+            directory = os.path.join(self.save_directory, name)
+            if is_checkpoint(directory):
+                manifests.append((directory, read_manifest(directory)))
+        for directory, manifest in sorted(manifests, key=lambda item: item[1]['generation'] or 0):
+            if manifest.get('generation') is not None:
+                self.add(directory, manifest)
+
+    def _track(self, entry):
+        self.entries[entry['generation']] = entry
+        if self.latest_generation is None or entry['generation'] > self.latest_generation:
+            self.latest_generation = entry['generation']
+
+    def _untrack(self, generation):
+        if self.entries.pop(generation, None) is None:
+            return False
+        # Retention never prunes the newest save, so this scan is rare
+        if generation == self.latest_generation:
+            self.latest_generation = max(self.entries) if self.entries else None
+        return True
+
+    def _append(self, entry):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class RetentionPolicy:
+    """Decides which generations to keep: the last N, the best K by rating and every M-th
+
+    The rating is GameInstance.get_performance_ratio() at save time: agent1's recent
+    win ratio against an opponent that keeps learning too. It is a cheap proxy for
+    strength, not a fixed evaluation, so keep_last and keep_every should stay on.
+    """
+
+    def __init__(self, keep_last=None, keep_best=None, keep_every=None):
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.keep_every = keep_every
+
+    def select_expired(self, entries):
+        if not entries or not (self.keep_last or self.keep_best or self.keep_every):
+            return []
+
+        by_generation = sorted(entries, key=lambda entry: entry['generation'])
+        keep = {by_generation[-1]['generation']}  # Never prune the newest save
+        if self.keep_last:
+            keep.update(entry['generation'] for entry in by_generation[-self.keep_last:])
+        if self.keep_best:
+            rated = [entry for entry in entries if entry.get('rating') is not None]
+            rated.sort(key=lambda entry: entry['rating'], reverse=True)
+            keep.update(entry['generation'] for entry in rated[:self.keep_best])
+        if self.keep_every:
+            keep.update(entry['generation'] for entry in entries if entry['generation'] % self.keep_every == 0)
+        return [entry for entry in by_generation if entry['generation'] not in keep]
+
+
+class CheckpointWriter:
+    """Writes game snapshots on a background thread and reports when they finish"""
+
+    def __init__(self, index=None, retention=None, live_segments=None):
+        self.index = index
+        self.retention = retention
+        # Optional callable returning segment names still used by buffers in memory,
+        # which may not be listed by any manifest that survived retention
+        self.live_segments = live_segments
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot, directory):
+        self.jobs.put((snapshot, directory))
+
+    def poll(self):
+        # (directory, seconds taken, error or None) for each save finished since the last poll
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def wait(self):
+        # Block until every queued save has been written
+        self.jobs.join()
+
+    def _run(self):
+        while True:
+            snapshot, directory = self.jobs.get()
+            start = time.perf_counter()
+            try:
+                write_snapshot(snapshot, directory)
+                if self.index:
+                    self.index.add(directory, snapshot['manifest'])
+                    self._apply_retention()
+                self.results.put((directory, time.perf_counter() - start, None))
+            except Exception as e:
+                discard_snapshot(snapshot)
+                self.results.put((directory, time.perf_counter() - start, e))
+            finally:
+                self.jobs.task_done()
+
+    def _apply_retention(self):
+        if not self.retention:
+            return
+        expired = self.retention.select_expired(self.index.get_entries())
+        for entry in expired:
+            shutil.rmtree(self.index.get_path(entry), ignore_errors=True)
+            self.index.remove(entry['generation'])
+        if expired:
+            self._remove_unreferenced_segments()
+
+    def _remove_unreferenced_segments(self):
+        # Segments are shared, so one can only go once no remaining generation or live buffer lists it
+        referenced = set()
+        live = self.live_segments() if self.live_segments else set()
+        for entry in self.index.get_entries():
+            manifest = read_manifest(self.index.get_path(entry))
+            for name, agent_entry in manifest['agents'].items():
+                for segment_name in agent_entry.get('replay', {}).get('segments', []):
+                    referenced.add((name, segment_name))
+
+        replay_root = os.path.join(self.index.save_directory, REPLAY_DIRECTORY)
+        if not os.path.isdir(replay_root):
+            return
+        for name in os.listdir(replay_root):
+            for filename in os.listdir(os.path.join(replay_root, name)):
+                segment_name = os.path.splitext(filename)[0]
+                if (name, segment_name) not in referenced and segment_name not in live:
+                    os.remove(os.path.join(replay_root, name, filename))
+
+
+def _write_agent(snapshot, directory, replay_directory, manifest):
+    entry = dict(snapshot['entry'])
+    if 'policy' not in snapshot:
+        return entry
+
+    os.makedirs(directory)
+    for name in ('policy', 'target', 'optimizer'):
+        _write_file(os.path.join(directory, f'{name}.pt'), lambda f: torch.save(snapshot[name], f))
+
+    export = {
+        'state_dict': snapshot['policy'],
+        'input_size': entry['input_size'],
+        'hidden_size': entry['hidden_size'],
+        'output_size': entry['output_size'],
+        # What a play-only agent needs besides the weights; states are already scaled to the court
+        'metadata': {
+            'generation': manifest['generation'],
+            'shared_replay': manifest['shared_replay'],
+            'action_repeat': entry['action_repeat'],
+        },
+    }
+    _write_file(os.path.join(directory, 'inference.pt'), lambda f: torch.save(export, f))
+
+    if 'replay' in snapshot:
+        replay = snapshot['replay']
+        if replay['segment']:
+            os.makedirs(replay_directory, exist_ok=True)
+            segment = PrioritizedReplayBuffer.snapshot_to_segment(replay)
+            segment_path = os.path.join(replay_directory, f"{replay['segment']}.npz")
+            _write_file(segment_path + TEMP_SUFFIX, lambda f: np.savez(f, **segment))
+            os.replace(segment_path + TEMP_SUFFIX, segment_path)
+            _fsync_directory(replay_directory)
+        entry['replay'] = {'length': replay['length'], 'position': replay['position'], 'segments': replay['segments']}
+
+    _fsync_directory(directory)
+    return entry
+
+
+def _write_file(path, write):
+    with open(path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _fsync_directory(directory):
+    # Directory entries need their own fsync on POSIX; Windows cannot open directories
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _directory_size(directory):
+    size = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+def _copy_state_dict(state_dict):
+    return {key: value.detach().to('cpu', copy=True) for key, value in state_dict.items()}
+
+
+def _load_tensors(path, device):
+    return torch.load(path, map_location=device, weights_only=True)
@@ -0,0 +1,234 @@
+import bisect
+import csv
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ai.agent import Agent
+
+AGENT_FIELDS = ['train_steps_per_second', 'loss', 'q_mean', 'q_max', 'td_error', 'epsilon', 'beta', 'replay_size']
+# Every column a row can have; rows for non-learning agents leave their agentN_* columns empty
+FIELDS = (['time', 'generation', 'env_steps', 'env_steps_per_second', 'score1', 'score2',
+           'total_reward1', 'total_reward2', 'rally_length']
+          + [f'{name}_{field}' for name in ('agent1', 'agent2') for field in AGENT_FIELDS])
+
+
+class MetricsWriter:
+    """Appends metric rows to a JSONL or CSV file from a background thread.
+
+    write() only adds the row to an in-memory batch, so callers never wait on disk.
+    The format follows the file extension.
+    """
+
+    def __init__(self, path, flush_interval=5.0):
+        self.path = path
+        self.csv = path.endswith('.csv')
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.failing = False  # Set while flushes fail, so the error is reported once
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, row):
+        with self.lock:
+            self.pending.append(row)
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        try:
+            self._flush()
+        except OSError as e:
+            print(f"Writing metrics failed, {len(self.pending)} rows lost: {e}")
+
+    def _run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self._flush()
+            except OSError as e:
+                if not self.failing:
+                    print(f"Writing metrics failed, will retry: {e}")
+                self.failing = True
+            else:
+                if self.failing:
+                    print("Writing metrics works again")
+                self.failing = False
+
+    def _flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+        if not rows:
+            return
+        try:
+            with open(self.path, 'a', newline='') as f:
+                # Formatted first and written in one call, so a failure rarely leaves half a batch
+                text = io.StringIO()
+                if self.csv:
+                    self._write_csv(text, rows, header=f.tell() == 0)
+                else:
+                    for row in rows:
+                        text.write(json.dumps(row) + '\n')
+                f.write(text.getvalue())
+        except OSError:
+            # Kept for the next flush, ahead of rows written since
+            with self.lock:
+                self.pending = rows + self.pending
+            raise
+
+    def _write_csv(self, f, rows, header):
+        # Fixed columns, so a first row from a Human vs AI or random game drops nothing later
+        writer = csv.DictWriter(f, FIELDS, extrasaction='ignore')
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+class MetricsCollector:
+    """Turns a GameInstance's counters into per-interval rows"""
+
+    def __init__(self):
+        self.instance = None
+        self.last_time = None
+
+    def collect(self, instance, generation):
+        now = time.time()
+        if instance is not self.instance:
+            # Counters belong to the instance, so a new one starts a new interval
+            self.instance = instance
+            self.last_time = now
+            self.last_ticks = instance.ticks
+            self.last_hits = instance.total_hits1 + instance.total_hits2
+            self.last_points = instance.score1 + instance.score2
+            for agent in (instance.agent1, instance.agent2):
+                if isinstance(agent, Agent):
+                    agent.pop_training_stats()
+            return None
+
+        elapsed = max(now - self.last_time, 1e-9)
+        hits = instance.total_hits1 + instance.total_hits2
+        points = instance.score1 + instance.score2
+        row = {
+            'time': round(now, 3),
+            'generation': generation,
+            'env_steps': instance.ticks,
+            'env_steps_per_second': (instance.ticks - self.last_ticks) / elapsed,
+            'score1': instance.score1,
+            'score2': instance.score2,
+            'total_reward1': instance.total_reward1,
+            'total_reward2': instance.total_reward2,
+            # Hits per point over the interval; None when no point was played
+            'rally_length': (hits - self.last_hits) / (points - self.last_points) if points > self.last_points else None,
+        }
+        for name, agent in (('agent1', instance.agent1), ('agent2', instance.agent2)):
+            if not isinstance(agent, Agent):
+                continue
+            stats = agent.pop_training_stats()
+            row[f'{name}_train_steps_per_second'] = stats['train_steps'] / elapsed
+            row[f'{name}_loss'] = stats['loss']
+            row[f'{name}_q_mean'] = stats['q_mean']
+            row[f'{name}_q_max'] = stats['q_max']
+            row[f'{name}_td_error'] = stats['td_error']
+            row[f'{name}_epsilon'] = agent.epsilon
+            row[f'{name}_beta'] = agent.beta
+            row[f'{name}_replay_size'] = len(agent.memory)
+
+        self.last_time = now
+        self.last_ticks = instance.ticks
+        self.last_hits = hits
+        self.last_points = points
+        return row
+
+
+class Histogram:
+    """Bucketed observations in the Prometheus histogram layout"""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        cumulative = []
+        total = 0
+        for count in self.counts[:-1]:
+            total += count
+            cumulative.append(total)
+        return (self.buckets, cumulative, self.sum, self.count)
+
+
+def format_prometheus(families):
+    """Render (name, type, help, samples) families in the Prometheus text format.
+
+    Samples are (labels, value) pairs, or a Histogram.snapshot() for histograms.
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == 'histogram':
+            buckets, cumulative, total, count = samples
+            for bound, bucket_count in zip(buckets, cumulative):
+                lines.append(f'{name}_bucket{{le="{bound}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {count}')
+            lines.append(f"{name}_sum {total}")
+            lines.append(f"{name}_count {count}")
+            continue
+        for labels, value in samples:
+            if labels:
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves the last published metrics at /metrics from a daemon thread.
+
+    The game thread swaps in a whole new snapshot with publish() and the request
+    handler only reads whichever snapshot is current, so neither waits on the other.
+    """
+
+    def __init__(self, port, host='127.0.0.1'):
+        self.snapshot = []
+        metrics_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = format_prometheus(metrics_server.snapshot).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def publish(self, snapshot):
+        self.snapshot = snapshot
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,97 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+from collections import deque
+import numpy as np
+
+PROFILE_DIRECTORY = 'profiles'
+
+
+class Profiler:
+    """Per-phase timers for the overlay, plus on-demand cProfile captures.
+
+    Code being timed takes start = time.perf_counter() and calls record(phase, start)
+    when done. Durations are only kept while the overlay is enabled, so a disabled
+    timer costs one clock read and an attribute check.
+    """
+
+    def __init__(self, window=600, refresh_interval=0.5):
+        self.enabled = False
+        self.window = window  # Calls per phase the percentiles are taken over
+        self.refresh_interval = refresh_interval  # Seconds between overlay summaries
+        self.durations = {}  # phase -> deque of recent call durations
+        self.totals = {}  # phase -> seconds spent since enabled
+        self.last_totals = {}
+        self.last_refresh = 0.0
+        self.summary_rows = []
+        self.capture = None  # (cProfile.Profile, end time, directory) while capturing
+
+    def record(self, phase, start):
+        if self.enabled:
+            duration = time.perf_counter() - start
+            if phase not in self.durations:
+                self.durations[phase] = deque(maxlen=self.window)
+                self.totals[phase] = 0.0
+            self.durations[phase].append(duration)
+            self.totals[phase] += duration
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.durations.clear()
+        self.totals.clear()
+        self.last_totals = {}
+        self.last_refresh = time.perf_counter()
+        self.summary_rows = []
+
+    def summary(self):
+        """Overlay rows of column strings, recomputed at most every refresh_interval seconds"""
+        now = time.perf_counter()
+        if now - self.last_refresh < self.refresh_interval:
+            return self.summary_rows
+        elapsed = now - self.last_refresh
+        self.last_refresh = now
+
+        rows = [("phase (ms)", "p50", "p95", "p99", "load")]
+        for phase, durations in sorted(self.durations.items()):
+            if not durations:
+                continue
+            p50, p95, p99 = np.percentile(np.array(durations), (50, 95, 99)) * 1000
+            # Share of wall time spent in the phase since the last refresh
+            load = (self.totals[phase] - self.last_totals.get(phase, 0.0)) / elapsed
+            rows.append((phase, f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}", f"{load:.1%}"))
+        self.last_totals = dict(self.totals)
+        self.summary_rows = rows
+        return rows
+
+    def start_capture(self, seconds, directory=PROFILE_DIRECTORY):
+        if self.capture:
+            return False
+        profile = cProfile.Profile()
+        self.capture = (profile, time.perf_counter() + seconds, directory)
+        profile.enable()
+        return True
+
+    def poll_capture(self):
+        """Finish a capture whose time is up; returns the report path once written"""
+        if not self.capture or time.perf_counter() < self.capture[1]:
+            return None
+        profile, _, directory = self.capture
+        profile.disable()
+        self.capture = None
+
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, time.strftime('profile_%Y%m%d_%H%M%S'))
+        profile.dump_stats(base + '.prof')
+        report = io.StringIO()
+        stats = pstats.Stats(profile, stream=report)
+        stats.sort_stats('cumulative').print_stats(60)
+        stats.sort_stats('tottime').print_stats(30)
+        with open(base + '.txt', 'w') as f:
+            f.write(report.getvalue())
+        return base + '.txt'
+
+
+# Shared by the game loop, GameInstance, Agent and GameUI
+profiler = Profiler()
@@ -27,6 +27,9 @@ class Settings:
             'glow_intensity': 180,
             'show_trails': True,
             'trail_length': 5,
+            # Training settings
+            'shared_replay': False,
+            'action_repeat': 1,
             # UI settings
             'ui_scale': 1.0,
         }
@@ -44,9 +47,8 @@ class Settings:
         for key, value in defaults.items():
             setattr(self, key, value)
 
-    def save_settings(self):
-        settings_path = os.path.join('data', 'settings.json')
-        settings_dict = {
+    def to_dict(self):
+        return {
             # Game settings
             'ball_speed': self.ball_speed,
             'paddle_speed': self.paddle_speed,
@@ -59,9 +61,16 @@ class Settings:
             'glow_intensity': self.glow_intensity,
             'show_trails': self.show_trails,
             'trail_length': self.trail_length,
+            # Training settings
+            'shared_replay': self.shared_replay,
+            'action_repeat': self.action_repeat,
             # UI settings
             'ui_scale': self.ui_scale,
         }
+
+    def save_settings(self):
+        settings_path = os.path.join('data', 'settings.json')
+        settings_dict = self.to_dict()
         
         try:
             os.makedirs(os.path.dirname(settings_path), exist_ok=True)
@@ -85,6 +94,7 @@ class Settings:
         if demo_game:
             demo_game.ball_dx = demo_game.width // 100 * self.demo_ball_speed / 5
             demo_game.ball_dy = demo_game.height // 150 * self.demo_ball_speed / 5
+            demo_game.glow_intensity = self.demo_glow_intensity
             # Add other demo settings as needed
 
     def show_settings_menu(self, screen, font):
@@ -94,6 +104,7 @@ class Settings:
         
         # Create demo game for background
         demo_game = DemoGame(screen.get_width(), screen.get_height())
+        self.apply_settings_to_demo(demo_game)
         
         # Settings categories
         settings = {
@@ -106,6 +117,10 @@ class Settings:
                 ("Show Trails", "show_trails", False, True),
                 ("Trail Length", "trail_length", 1, 20),
             ],
+            "Training Settings": [
+                ("Shared Replay (Self-Play)", "shared_replay", False, True),
+                ("Action Repeat", "action_repeat", 1, 8),
+            ],
             "Demo Settings": [
                 ("Demo Ball Speed", "demo_ball_speed", 1, 20),
                 ("Demo Paddle Speed", "demo_paddle_speed", 1, 20),